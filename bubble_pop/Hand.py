@@ -1,9 +1,17 @@
 import cv2
 import mediapipe as mp
+import numpy as np
 import time
 
+from hand_worker import NUM_LANDMARKS, inference_size, rgb_for_inference
+
 class HandDetector:
-    def __init__(self, mode=False, maxHands=2, modelComp=1, detectionCon=0.5, trackCon=0.5):
+    def __init__(self, mode=False, maxHands=2, modelComp=1, detectionCon=0.5, trackCon=0.5,
+                 inferenceWidth=None, reuseBuffers=True, readOnly=True):
+        """inferenceWidth runs MediaPipe on a copy downscaled to that width (same aspect);
+        landmarks are normalized, so they still land on the full frame. reuseBuffers
+        resizes and converts colour into buffers kept between frames, and readOnly hands
+        MediaPipe a read-only array so it can use it without copying."""
         self.mode = mode
         self.maxHands = maxHands
         self.detectionCon = detectionCon
@@ -15,9 +23,48 @@ class HandDetector:
                                         self.detectionCon, self.trackCon)
         self.mpDraw = mp.solutions.drawing_utils
 
+        # Reused by findAllPositions so no arrays are allocated per frame
+        self.lmArray = np.zeros((self.maxHands, NUM_LANDMARKS, 3), dtype=np.float32)
+        self.handedness = np.zeros(self.maxHands, dtype=np.int8)  # 0 left, 1 right
+        self.handScores = np.zeros(self.maxHands, dtype=np.float32)
+
+        self.inferenceWidth = inferenceWidth
+        self.reuseBuffers = reuseBuffers
+        self.readOnly = readOnly
+        self.buffers = {} if reuseBuffers else None
+        self.inferenceMs = 0.0      # MediaPipe time on the current frame; findHands resets it
+
+    def set_model_complexity(self, modelComp):
+        """Swap the MediaPipe graph for one of the given complexity (0 light, 1 full)"""
+        if modelComp == self.modelComp:
+            return
+        self.hands.close()
+        self.modelComp = modelComp
+        self.hands = self.mpHands.Hands(self.mode, self.maxHands, self.modelComp,
+                                        self.detectionCon, self.trackCon)
+
+    def set_inference_width(self, width):
+        self.inferenceWidth = width
+
+    def inference_size(self, shape):
+        return inference_size(shape, self.inferenceWidth)
+
+    def prepare(self, img):
+        """The RGB array MediaPipe runs on: img downscaled to the inference size and colour converted"""
+        return rgb_for_inference(img, self.inferenceWidth, self.buffers, self.readOnly)
+
+    def process(self, img, hands=None):
+        """Run MediaPipe on img (BGR) and keep the results; hands is the graph to use,
+        self.hands by default"""
+        imgRGB = self.prepare(img)
+        start = time.perf_counter()
+        self.results = (hands or self.hands).process(imgRGB)
+        self.inferenceMs += (time.perf_counter() - start) * 1000
+        return self.results
+
     def findHands(self, img, draw=True):
-        imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.hands.process(imgRGB)
+        self.inferenceMs = 0.0
+        self.process(img)
 
         if self.results.multi_hand_landmarks:
             for handLms in self.results.multi_hand_landmarks:
@@ -27,6 +74,11 @@ class HandDetector:
         return img
     
 
+    def numHands(self):
+        if self.results.multi_hand_landmarks:
+            return len(self.results.multi_hand_landmarks)
+        return 0
+
     def findPosition(self, img, handNo=0, draw=True):
         lmList = []
         if self.results.multi_hand_landmarks:
@@ -39,7 +91,33 @@ class HandDetector:
                     cv2.circle(img, (cx, cy), 15, (255, 0, 255), cv2.FILLED)
 
         return lmList
-            
+
+    def findAllPositions(self, img=None, normalized=False):
+        """Landmarks of every detected hand at once
+
+        Returns (landmarks, handedness, scores) where landmarks is a (hands, 21, 3)
+        float32 view of a buffer reused between frames, in pixels of img unless
+        normalized is True. handedness is 0 for left and 1 for right.
+        """
+        count = 0
+        if self.results.multi_hand_landmarks:
+            count = min(len(self.results.multi_hand_landmarks), self.maxHands)
+            for i in range(count):
+                hand = self.lmArray[i]
+                for id, lm in enumerate(self.results.multi_hand_landmarks[i].landmark):
+                    hand[id, 0] = lm.x
+                    hand[id, 1] = lm.y
+                    hand[id, 2] = lm.z
+                if self.results.multi_handedness:
+                    classification = self.results.multi_handedness[i].classification[0]
+                    self.handedness[i] = classification.label == "Right"
+                    self.handScores[i] = classification.score
+            if not normalized:
+                h, w = img.shape[:2]
+                self.lmArray[:count, :, 0] *= w
+                self.lmArray[:count, :, 1] *= h
+        return self.lmArray[:count], self.handedness[:count], self.handScores[:count]
+
 def main():
     pTime = 0
     cTime = 0
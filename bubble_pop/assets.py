@@ -0,0 +1,78 @@
+import hashlib
+import os
+
+import pygame
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pranic_poppers")
+
+
+class AssetManager:
+    """Loads images from the package's assets folder once, in the display's pixel format
+
+    Scaled variants are cached per size, and a set of equally sized icons can be
+    packed into a single atlas which is also kept on disk between runs.
+    """
+
+    def __init__(self, asset_dir=ASSET_DIR, cache_dir=CACHE_DIR):
+        self.asset_dir = asset_dir
+        self.cache_dir = cache_dir
+        self.images = dict()
+        self.scaled_images = dict()
+        self.atlases = dict()
+
+    def path(self, name):
+        return os.path.join(self.asset_dir, name)
+
+    def convert(self, surface, alpha):
+        return surface.convert_alpha() if alpha else surface.convert()
+
+    def load(self, name, alpha=True):
+        """Image as loaded, converted to the display format"""
+        key = (name, alpha)
+        if key not in self.images:
+            self.images[key] = self.convert(pygame.image.load(self.path(name)), alpha)
+        return self.images[key]
+
+    def scaled(self, name, size, alpha=True):
+        """Image scaled to size (width, height), cached per size"""
+        size = (int(size[0]), int(size[1]))
+        key = (name, size, alpha)
+        if key not in self.scaled_images:
+            self.scaled_images[key] = pygame.transform.scale(self.load(name, alpha), size)
+        return self.scaled_images[key]
+
+    def atlas_key(self, names, size):
+        digest = hashlib.md5()
+        for name in names:
+            digest.update(f"{name}:{os.path.getmtime(self.path(name))};".encode())
+        digest.update(f"{size[0]}x{size[1]}".encode())
+        return digest.hexdigest()[:16]
+
+    def atlas(self, names, size):
+        """Pack names, each scaled to size, into one surface; returns one subsurface per name
+
+        The packed atlas is saved under cache_dir so later runs load one image instead of
+        decoding and scaling every icon again.
+        """
+        size = (int(size[0]), int(size[1]))
+        key = (tuple(names), size)
+        if key not in self.atlases:
+            cache_path = os.path.join(self.cache_dir, f"atlas_{self.atlas_key(names, size)}.png")
+            if os.path.exists(cache_path):
+                sheet = self.convert(pygame.image.load(cache_path), True)
+            else:
+                sheet = pygame.Surface((size[0] * len(names), size[1]), pygame.SRCALPHA)
+                for i, name in enumerate(names):
+                    # BLEND_RGBA_MAX onto the transparent sheet copies pixels and alpha unchanged
+                    sheet.blit(pygame.transform.scale(self.load(name), size), (i * size[0], 0),
+                               special_flags=pygame.BLEND_RGBA_MAX)
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    pygame.image.save(sheet, cache_path)
+                except (OSError, pygame.error) as e:
+                    print(f"Could not cache sprite atlas: {e}")
+                sheet = self.convert(sheet, True)
+            icons = [sheet.subsurface((i * size[0], 0, size[0], size[1])) for i in range(len(names))]
+            self.atlases[key] = (sheet, icons)
+        return self.atlases[key][1]
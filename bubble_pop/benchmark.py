@@ -0,0 +1,209 @@
+"""Headless benchmark of the Pranic Poppers game loop
+
+Runs Model, View and Controller under SDL's dummy video driver, fed by a video file
+or synthetic frames instead of the camera, and optionally by a recorded landmark
+trace instead of MediaPipe. Reports FPS and p50/p95/p99 latency per stage for each
+circle count and screen resolution.
+
+    python bubble_pop/benchmark.py --circles 10 40 200 --resolutions 1280x720 1920x1080
+"""
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import cv2
+import numpy as np
+import pygame
+
+import pranic_poppers as pp
+from capture import SyntheticCapture
+from landmark_trace import TraceDetector
+from poppers_model import CIRCLE_CAPACITY
+
+STAGES = ["capture", "detect", "preview", "model", "draw", "present", "frame"]
+NUM_LANDMARKS = 21
+
+
+class LoopingVideoCapture:
+    """cv2.VideoCapture over a file that rewinds at the end instead of failing"""
+
+    def __init__(self, path):
+        self.cap = cv2.VideoCapture(path)
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+    def read(self):
+        success, img = self.cap.read()
+        if not success:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, img = self.cap.read()
+        return success, img
+
+    def grab(self):
+        if self.cap.grab():
+            return True
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return self.cap.grab()
+
+
+def synthetic_trace(frames, hands=1):
+    """Normalized landmarks (frames, hands, 21, 3) with each hand's fingertip tracing a Lissajous path"""
+    t = np.arange(frames, dtype=np.float32)[:, None] / 30.0
+    phase = np.arange(hands, dtype=np.float32)[None, :]
+    x = 0.5 + 0.4 * np.sin(1.3 * t + phase)
+    y = 0.5 + 0.4 * np.sin(1.7 * t + 2.0 * phase)
+    landmarks = np.zeros((frames, hands, NUM_LANDMARKS, 3), dtype=np.float32)
+    landmarks[..., 0] = x[..., None]
+    landmarks[..., 1] = y[..., None]
+    return landmarks, np.full(frames, hands, dtype=np.int32)
+
+
+class StageTimer:
+    """Accumulates wall time per stage for the current frame"""
+
+    def __init__(self, stages):
+        self.samples = {stage: [] for stage in stages}
+
+    def new_frame(self):
+        for samples in self.samples.values():
+            samples.append(0)
+
+    def wrap(self, stage, fn):
+        samples = self.samples[stage]
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            result = fn(*args, **kwargs)
+            samples[-1] += time.perf_counter_ns() - start
+            return result
+        return timed
+
+    def instrument(self, obj, stage, *names):
+        for name in names:
+            setattr(obj, name, self.wrap(stage, getattr(obj, name)))
+
+    def summary(self, skip=0):
+        result = {}
+        for stage, samples in self.samples.items():
+            ms = np.asarray(samples[skip:], dtype=np.float64) / 1e6
+            if len(ms) == 0:
+                continue
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            result[stage] = {"mean": float(ms.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+        return result
+
+
+def start_game(controller, circles):
+    controller.start_game()
+    # Pin the circle count so every frame carries the same load
+    controller.model.min_circles = controller.model.max_circles = circles
+    controller.model.check_circles_count()
+
+
+def run_case(resolution, circles, frames, warmup, make_capture, make_detector):
+    screen = pygame.display.set_mode(resolution)
+    model = pp.Model(capacity=max(CIRCLE_CAPACITY, 2 * circles + 64))
+    controller = pp.Controller(screen, cap=make_capture(), detector=make_detector(), model=model)
+    timer = StageTimer(STAGES)
+    timer.instrument(controller.stream, "capture", "read_latest")
+    timer.instrument(controller.detector, "detect", "findHands", "findPosition", "findAllPositions")
+    timer.instrument(controller.preview, "preview", "update")
+    timer.instrument(controller, "model", "step_simulation")
+    timer.instrument(controller.view, "draw", "draw_background", "draw_circles", "draw_halo", "draw_text",
+                     "draw_preview")
+    timer.instrument(controller.view, "present", "present")
+
+    start_game(controller, circles)
+    controller.stream.wait(1.0)
+    restarts = 0
+    begin = None
+    for i in range(warmup + frames):
+        if i == warmup:
+            begin = time.perf_counter()
+        timer.new_frame()
+        start = time.perf_counter_ns()
+        pygame.event.pump()
+        controller.update(pp.SIM_DT)
+        timer.samples["frame"][-1] = time.perf_counter_ns() - start
+        if not controller.running:
+            break
+        if controller.game_state != "GAME":
+            start_game(controller, circles)
+            restarts += 1
+    elapsed = time.perf_counter() - begin if begin is not None else 0.0
+
+    controller.stream.stop()
+    controller.cap.release()
+    measured = max(0, len(timer.samples["frame"]) - warmup)
+    return {
+        "resolution": f"{resolution[0]}x{resolution[1]}",
+        "circles": circles,
+        "frames": measured,
+        "fps": measured / elapsed if elapsed > 0 else 0.0,
+        "dropped_camera_frames": controller.stream.dropped,
+        "restarts": restarts,
+        "stages": timer.summary(skip=warmup),
+    }
+
+
+def print_report(results):
+    for result in results:
+        print(f"\n{result['resolution']}  circles={result['circles']}  frames={result['frames']}  "
+              f"fps={result['fps']:.1f}  dropped={result['dropped_camera_frames']}")
+        print(f"  {'stage':<10}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+        for stage, stats in result["stages"].items():
+            print(f"  {stage:<10}{stats['mean']:>9.3f}{stats['p50']:>9.3f}{stats['p95']:>9.3f}{stats['p99']:>9.3f}")
+
+
+def parse_resolution(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--circles", type=int, nargs="+", default=[10, 40, 200])
+    parser.add_argument("--resolutions", type=parse_resolution, nargs="+", default=[(1280, 720), (1920, 1080)])
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=60)
+    parser.add_argument("--video", help="Video file to use instead of synthetic frames")
+    parser.add_argument("--camera-fps", type=float, default=30, help="Synthetic frame rate, 0 for unpaced")
+    parser.add_argument("--trace", help="Landmark trace recorded with TraceWriter instead of MediaPipe")
+    parser.add_argument("--synthetic-trace", action="store_true", help="Replay a generated fingertip path")
+    parser.add_argument("--hands", type=int, default=1, help="Hands in the synthetic trace")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if args.video:
+        make_capture = lambda: LoopingVideoCapture(args.video)
+    else:
+        make_capture = lambda: SyntheticCapture(fps=args.camera_fps)
+
+    if args.trace:
+        make_detector = lambda: TraceDetector.from_file(args.trace, realtime=False)
+    elif args.synthetic_trace:
+        trace = synthetic_trace(args.frames + args.warmup, args.hands)
+        make_detector = lambda: TraceDetector(*trace, maxHands=args.hands)
+    else:
+        make_detector = lambda: None
+
+    pp.init_pygame()
+    results = []
+    for resolution in args.resolutions:
+        for circles in args.circles:
+            results.append(run_case(resolution, circles, args.frames, args.warmup, make_capture, make_detector))
+    pygame.quit()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
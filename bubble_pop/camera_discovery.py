@@ -0,0 +1,180 @@
+"""Find the camera to play with, quickly and on any platform
+
+Devices are enumerated without opening them where the OS allows it (sysfs on Linux,
+ffmpeg's avfoundation listing on macOS), candidates are probed in parallel with a
+timeout, and the chosen device is cached on disk so warm starts skip probing
+altogether. The capture format is left to whoever opens the camera
+(capture_config.open_capture), which asks for the one it needs.
+"""
+import glob
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from subprocess import PIPE, SubprocessError, run
+
+import cv2
+
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pranic_poppers", "camera.json")
+
+# Name fragments, best first; anything unmatched ranks between external and built-in cameras
+PREFERRED_NAMES = ["USB Camera", "USB"]
+BUILTIN_NAMES = ["FaceTime", "Built-in", "Integrated"]
+
+
+def list_v4l2_devices(sysfs_root="/sys/class/video4linux"):
+    """Capture nodes from sysfs as [{'index', 'path', 'name'}] without opening any stream"""
+    devices = []
+    for node in sorted(glob.glob(os.path.join(sysfs_root, "video*"))):
+        match = re.fullmatch(r"video(\d+)", os.path.basename(node))
+        if not match:
+            continue
+        # A camera exposes a metadata node next to its capture node; only index 0 streams video
+        try:
+            with open(os.path.join(node, "index")) as f:
+                if f.read().strip() != "0":
+                    continue
+        except OSError:
+            pass
+        try:
+            with open(os.path.join(node, "name")) as f:
+                name = f.read().strip()
+        except OSError:
+            name = ""
+        devices.append({"index": int(match.group(1)), "path": f"/dev/video{match.group(1)}", "name": name})
+    if not devices:
+        # No sysfs (containers, some distros): fall back to the device nodes themselves
+        for path in sorted(glob.glob("/dev/video*")):
+            match = re.fullmatch(r"/dev/video(\d+)", path)
+            if match:
+                devices.append({"index": int(match.group(1)), "path": path, "name": ""})
+    return devices
+
+
+def list_avfoundation_devices():
+    """Video devices reported by ffmpeg's avfoundation input on macOS"""
+    command = ['ffmpeg', '-f', 'avfoundation', '-list_devices', 'true', '-i', '""']
+    try:
+        result = run(command, stdout=PIPE, stderr=PIPE, universal_newlines=True, timeout=5)
+    except (OSError, ValueError, SubprocessError) as e:   # SubprocessError covers the timeout
+        print(f"Could not list cameras with ffmpeg: {e}")
+        return []
+    devices = []
+    for item in result.stderr.splitlines():
+        if "AVFoundation audio devices" in item:
+            break
+        match = re.search(r"\]\s*\[(\d+)\]\s*(.+)$", item)
+        if match:
+            devices.append({"index": int(match.group(1)), "path": None, "name": match.group(2).strip()})
+    return devices
+
+
+def list_devices(max_index=5):
+    if sys.platform.startswith("linux"):
+        return list_v4l2_devices()
+    if sys.platform == "darwin":
+        devices = list_avfoundation_devices()
+        if devices:
+            return devices
+    return [{"index": index, "path": None, "name": ""} for index in range(max_index)]
+
+
+def rank(device):
+    name = device["name"]
+    for i, needle in enumerate(PREFERRED_NAMES):
+        if needle in name:
+            return i
+    if any(needle in name for needle in BUILTIN_NAMES):
+        return len(PREFERRED_NAMES) + 1
+    return len(PREFERRED_NAMES)
+
+
+def probe(device):
+    """device if it opens and delivers a frame, else None"""
+    cap = cv2.VideoCapture(device["index"])
+    try:
+        if not cap.isOpened():
+            return None
+        success, frame = cap.read()
+        if not success:
+            return None
+        return dict(device)
+    finally:
+        cap.release()
+
+
+def probe_all(devices, timeout=3.0):
+    """Probe every device at once; devices that hang past timeout are left behind
+
+    Each probe runs on a daemon thread, so one stuck in a driver call neither delays
+    this function nor keeps the interpreter from exiting.
+    """
+    finished = queue.Queue()
+
+    def run_probe(i, device):
+        try:
+            finished.put((i, probe(device)))
+        except Exception:
+            finished.put((i, None))
+
+    for i, device in enumerate(devices):
+        threading.Thread(target=run_probe, args=(i, device), daemon=True).start()
+    found = {}
+    deadline = time.monotonic() + timeout
+    for _ in devices:
+        try:
+            i, camera = finished.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            break
+        if camera is not None:
+            found[i] = camera
+    return [found[i] for i in sorted(found)]
+
+
+def load_cache(path=CACHE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cache(camera, path=CACHE_PATH):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(camera, f, indent=2)
+    except OSError as e:
+        print(f"Could not cache camera choice: {e}")
+
+
+def cache_still_valid(camera, devices):
+    """The cached camera is still attached under the same index and name"""
+    return any(d["index"] == camera.get("index") and d["name"] == camera.get("name") for d in devices)
+
+
+def find_camera(use_cache=True, timeout=3.0, cache_path=CACHE_PATH):
+    """Best available camera as a dict with index, path and name, or None"""
+    devices = list_devices()
+    if use_cache:
+        camera = load_cache(cache_path)
+        if camera is not None and cache_still_valid(camera, devices):
+            return camera
+    devices.sort(key=rank)
+    working = probe_all(devices, timeout)
+    if not working:
+        return None
+    camera = min(working, key=rank)
+    if use_cache:
+        save_cache(camera, cache_path)
+    return camera
+
+
+def get_camera_index():
+    camera = find_camera()
+    if camera is None:
+        return 0
+    return camera["index"]
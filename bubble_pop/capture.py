@@ -0,0 +1,160 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from capture_config import frame_age, grab_fresh
+from poppers_model import CAMERA_HEIGHT, CAMERA_WIDTH
+
+
+class CameraStream:
+    """Reads frames on a background thread and keeps only the newest one"""
+
+    def __init__(self, cap, flush=False, measure_age=False):
+        """flush drains frames queued in the driver before each retrieve; measure_age
+        tracks how old each frame was when grabbed and stamps frames with their capture
+        time when the driver reports it. Both need a cap with grab() and retrieve()."""
+        self.cap = cap
+        self.flush = flush
+        self.measure_age = measure_age
+        self.age = None         # Seconds between capture and grab of the newest frame, if known
+        self.flushed = 0        # Stale frames drained from the driver queue
+        self.lock = threading.Lock()
+        self.new_frame = threading.Event()
+        self.frame = None
+        self.timestamp = 0.0
+        self.seq = 0           # Sequence number of the newest captured frame
+        self.read_seq = 0      # Sequence number last handed to the game loop
+        self.dropped = 0       # Frames overwritten before anyone read them
+        self.history = [0.0] * 64  # Capture time of the last frames, by seq % len(history)
+        self.failed = False
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name="CameraStream", daemon=True)
+        self.thread.start()
+        return self
+
+    def grab(self, period):
+        """Grab and retrieve the next frame; returns (success, img, timestamp)"""
+        if self.flush:
+            success, flushed = grab_fresh(self.cap, period)
+            self.flushed += flushed
+        else:
+            success = self.cap.grab()
+        timestamp = time.perf_counter()
+        if not success:
+            return False, None, timestamp
+        if self.measure_age:
+            self.age = frame_age(self.cap)
+            if self.age is not None:
+                timestamp -= self.age
+        success, img = self.cap.retrieve()
+        return success, img, timestamp
+
+    def _loop(self):
+        split = self.flush or self.measure_age
+        period = 1.0 / (self.cap.get(cv2.CAP_PROP_FPS) or 30.0) if split else 0.0
+        while self.running:
+            if split:
+                success, img, timestamp = self.grab(period)
+            else:
+                success, img = self.cap.read()
+                timestamp = time.perf_counter()
+            if not success:
+                self.failed = True
+                self.running = False
+                self.new_frame.set()
+                break
+            with self.lock:
+                if self.seq > self.read_seq:
+                    self.dropped += 1
+                self.frame = img
+                self.timestamp = timestamp
+                self.seq += 1
+                self.history[self.seq % len(self.history)] = timestamp
+            self.new_frame.set()
+
+    def read_latest(self):
+        """Return (frame, seq, timestamp) if a newer frame arrived, else None"""
+        with self.lock:
+            if self.seq == self.read_seq:
+                return None
+            self.read_seq = self.seq
+            self.new_frame.clear()
+            return self.frame, self.seq, self.timestamp
+
+    def timestamp_of(self, seq):
+        """Capture time of frame seq, or None once it has fallen out of the history"""
+        with self.lock:
+            if seq <= 0 or seq > self.seq or self.seq - seq >= len(self.history):
+                return None
+            return self.history[seq % len(self.history)]
+
+    def wait(self, timeout=None):
+        """Block until a new frame is available (or capture fails)"""
+        return self.new_frame.wait(timeout)
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+
+class SyntheticCapture:
+    """Stand-in for cv2.VideoCapture producing a moving test pattern at a given fps"""
+
+    def __init__(self, width=CAMERA_WIDTH, height=CAMERA_HEIGHT, fps=30):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.count = 0
+        self.opened = True
+        self.grabbed = None
+        ramp = np.linspace(0, 255, width, dtype=np.float32)
+        self.base = np.repeat(np.tile(ramp, (height, 1))[:, :, None], 3, axis=2).astype(np.uint8)
+        self.next_time = time.perf_counter()
+
+    def isOpened(self):
+        return self.opened
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def read(self):
+        if not self.opened:
+            return False, None
+        if self.fps:
+            # Pace frames like a real camera would
+            self.next_time += 1.0 / self.fps
+            delay = self.next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.next_time -= delay
+        self.count += 1
+        frame = np.roll(self.base, self.count * 4, axis=1)
+        return True, frame
+
+    def grab(self):
+        success, self.grabbed = self.read()
+        return success
+
+    def retrieve(self):
+        return self.grabbed is not None, self.grabbed
+
+    def release(self):
+        self.opened = False
@@ -0,0 +1,279 @@
+"""Capture mode negotiation and frame age measurement
+
+Requests an explicit pixel format, resolution, frame rate and driver buffer size, and
+reads back what the driver actually accepted. Measures how old grabbed frames are,
+from the driver's buffer timestamps when it gives them and from grab timing when not,
+and can calibrate a camera by trying its modes and keeping the one whose frames
+arrive youngest. Any source cv2.VideoCapture opens works, so a v4l2loopback device
+or a video file can stand in for a camera:
+
+    python bubble_pop/capture_config.py --source 0
+    python bubble_pop/capture_config.py --source /dev/video10 --frames 60
+    python bubble_pop/capture_config.py --source clip.mp4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pranic_poppers", "capture_modes.json")
+
+DEFAULT_MODE = dict(fourcc="MJPG", width=640, height=480, fps=30, buffersize=1)
+CALIBRATION_FOURCCS = ["MJPG", "YUYV"]
+CALIBRATION_SIZES = [(640, 480), (1280, 720)]
+CALIBRATION_FPS = [60, 30]
+
+
+def fourcc_name(code):
+    code = int(code)
+    return "".join(chr((code >> 8 * i) & 0xFF) for i in range(4))
+
+
+def open_source(source):
+    """cv2.VideoCapture for a camera index, device path or video file"""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    if sys.platform.startswith("linux") and (isinstance(source, int) or source.startswith("/dev/video")):
+        return cv2.VideoCapture(source, cv2.CAP_V4L2)
+    return cv2.VideoCapture(source)
+
+
+def readback(cap):
+    """The mode the driver is actually in"""
+    return dict(fourcc=fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)),
+                width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                fps=cap.get(cv2.CAP_PROP_FPS),
+                buffersize=int(cap.get(cv2.CAP_PROP_BUFFERSIZE)))
+
+
+def configure(cap, mode):
+    """Request mode (any of fourcc, width, height, fps, buffersize) and read back the result
+
+    The format goes first since some drivers reset the size when it changes. Returns
+    (accepted, mismatches) where mismatches maps each setting the driver did not take
+    to (requested, actual).
+    """
+    if mode.get("fourcc"):
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*mode["fourcc"]))
+    if mode.get("width"):
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, mode["width"])
+    if mode.get("height"):
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, mode["height"])
+    if mode.get("fps"):
+        cap.set(cv2.CAP_PROP_FPS, mode["fps"])
+    if mode.get("buffersize"):
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, mode["buffersize"])
+    accepted = readback(cap)
+    mismatches = {}
+    for key, requested in mode.items():
+        if not requested:
+            continue
+        actual = accepted[key]
+        same = abs(actual - requested) < 0.5 if key == "fps" else actual == requested
+        if not same:
+            mismatches[key] = (requested, actual)
+    return accepted, mismatches
+
+
+def open_capture(source, mode=DEFAULT_MODE):
+    """Open source and negotiate mode; returns (cap, accepted, mismatches)"""
+    cap = open_source(source)
+    if not cap.isOpened():
+        return cap, None, {}
+    accepted, mismatches = configure(cap, mode)
+    for key, (requested, actual) in mismatches.items():
+        print(f"Capture {source}: asked for {key} {requested}, driver gave {actual}")
+    return cap, accepted, mismatches
+
+
+def frame_age(cap, now=None):
+    """Seconds since the driver captured the last grabbed frame, or None if it cannot tell
+
+    V4L2 reports buffer timestamps on the monotonic clock as CAP_PROP_POS_MSEC; files
+    and other backends report a stream position instead, which never looks plausible.
+    """
+    stamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+    now = time.monotonic() if now is None else now
+    age = now - stamp
+    if stamp <= 0 or not 0.0 <= age < 5.0:
+        return None
+    return age
+
+
+def grab_fresh(cap, period, max_grabs=10):
+    """Grab until one blocks for a good part of a frame period, so the queue is empty
+
+    A grab that returns at once was served from the driver's queue, which means its
+    frame is at least one period old. Returns (success, frames flushed).
+    """
+    for flushed in range(max_grabs):
+        start = time.perf_counter()
+        if not cap.grab():
+            return False, flushed
+        if time.perf_counter() - start > 0.5 * period:
+            return True, flushed
+    return True, max_grabs
+
+
+def measure(cap, frames=60, warmup=10, flush=False):
+    """Grab/retrieve timings and frame ages over a run of frames, in milliseconds
+
+    Without driver timestamps, the age is estimated from how many grabs in a row came
+    back faster than a quarter frame period, i.e. were already waiting in the queue.
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    period = 1.0 / fps
+    grab_ms, retrieve_ms, ages, flushed = [], [], [], []
+    queued = 0
+    for i in range(warmup + frames):
+        start = time.perf_counter()
+        if flush:
+            success, count = grab_fresh(cap, period)
+        else:
+            success, count = cap.grab(), 0
+        grabbed = time.perf_counter()
+        if not success:
+            break
+        age = frame_age(cap)
+        success, img = cap.retrieve()
+        retrieved = time.perf_counter()
+        if not success:
+            break
+        queued = queued + 1 if grabbed - start < 0.25 * period else 0
+        if i < warmup:
+            continue
+        grab_ms.append((grabbed - start) * 1000)
+        retrieve_ms.append((retrieved - grabbed) * 1000)
+        ages.append(age * 1000 if age is not None else queued * period * 1000)
+        flushed.append(count)
+    if not ages:
+        return None
+    return dict(frames=len(ages),
+                timestamped=frame_age(cap) is not None,
+                grab_ms=float(np.median(grab_ms)),
+                retrieve_ms=float(np.median(retrieve_ms)),
+                age_ms=float(np.median(ages)),
+                age_p95_ms=float(np.percentile(ages, 95)),
+                flushed=float(np.mean(flushed)),
+                # A frame is as stale as its age plus the time to decode it
+                latency_ms=float(np.median(ages) + np.median(retrieve_ms)))
+
+
+def candidate_modes(sizes=CALIBRATION_SIZES):
+    for fourcc in CALIBRATION_FOURCCS:
+        for width, height in sizes:
+            for fps in CALIBRATION_FPS:
+                yield dict(fourcc=fourcc, width=width, height=height, fps=fps, buffersize=1)
+
+
+def calibrate(source, modes=None, frames=45, warmup=10, flush=False):
+    """Try every mode on source; returns the results sorted from lowest latency
+
+    A mode the driver does not support falls back to another one; each mode the
+    driver actually ends up in is measured once, so a file or loopback device with a
+    single fixed mode still yields one result.
+    """
+    results = []
+    seen = set()
+    for mode in modes or candidate_modes():
+        cap = open_source(source)
+        try:
+            if not cap.isOpened():
+                return results
+            accepted, mismatches = configure(cap, mode)
+            key = tuple(sorted(accepted.items()))
+            if key in seen:
+                continue
+            seen.add(key)
+            stats = measure(cap, frames, warmup, flush)
+            if stats is not None:
+                results.append(dict(mode=mode, accepted=accepted, mismatches=sorted(mismatches), **stats))
+        finally:
+            cap.release()
+    results.sort(key=lambda r: r["latency_ms"])
+    return results
+
+
+def load_cache(path=CACHE_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def cache_key(source, modes):
+    """Cache entries are per source and per set of sizes tried, so a mode calibrated
+    across every size is never handed to a caller that needs one particular size"""
+    sizes = sorted({(mode["width"], mode["height"]) for mode in modes})
+    return f"{source} " + ",".join(f"{width}x{height}" for width, height in sizes)
+
+
+def save_cache(key, mode, path=CACHE_PATH):
+    cache = load_cache(path)
+    cache[key] = mode
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(cache, f, indent=2)
+    except OSError as e:
+        print(f"Could not cache capture mode: {e}")
+
+
+def calibrated_mode(source, modes=None, use_cache=True, path=CACHE_PATH):
+    """Lowest latency of modes for source, calibrated once and then read from the cache
+
+    A cached mode is only used if it is one of modes. Falls back to the first of modes
+    when nothing could be measured.
+    """
+    modes = list(modes or candidate_modes())
+    key = cache_key(source, modes)
+    if use_cache:
+        mode = load_cache(path).get(key)
+        if mode in modes:
+            return mode
+    results = calibrate(source, modes)
+    if not results:
+        return modes[0]
+    mode = results[0]["mode"]
+    if use_cache:
+        save_cache(key, mode, path)
+    return mode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default="0", help="Camera index, device path or video file")
+    parser.add_argument("--frames", type=int, default=45)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--flush", action="store_true", help="Drain queued frames before every retrieve")
+    parser.add_argument("--save", action="store_true", help="Cache the best mode for the game to use")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = calibrate(args.source, frames=args.frames, warmup=args.warmup, flush=args.flush)
+    if not results:
+        parser.error(f"could not capture from {args.source}")
+    print(f"{'mode':>24} {'accepted':>24} {'grab':>6} {'decode':>7} {'age':>6} {'age p95':>8} {'latency':>8}")
+    for r in results:
+        mode = "{fourcc} {width}x{height}@{fps}".format(**r["mode"])
+        accepted = "{fourcc} {width}x{height}@{fps:.0f} b{buffersize}".format(**r["accepted"])
+        age = f"{r['age_ms']:6.1f}" + ("" if r["timestamped"] else "~")
+        print(f"{mode:>24} {accepted:>24} {r['grab_ms']:6.1f} {r['retrieve_ms']:7.1f} {age:>6} "
+              f"{r['age_p95_ms']:8.1f} {r['latency_ms']:8.1f}")
+    print("(ms; ~ marks ages estimated from grab timing where the driver has no timestamps)")
+
+    if args.save:
+        save_cache(cache_key(args.source, list(candidate_modes())), results[0]["mode"])
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
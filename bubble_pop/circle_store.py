@@ -0,0 +1,102 @@
+import numpy as np
+
+STATE_BAD = 0
+STATE_GOOD = 1
+
+
+def segment_hits(start, end, circle_start, circle_end, radius):
+    """Whether a pointer moving start->end passes within radius of a circle moving
+    circle_start->circle_end over the same interval; all (n, 2), compared row by row"""
+    # In the circle's frame the pointer moves in a straight line from s to s + d
+    s = start - circle_start
+    d = (end - circle_end) - s
+    dd = d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]
+    t = np.clip(-(s[:, 0] * d[:, 0] + s[:, 1] * d[:, 1]) / np.where(dd > 0, dd, 1.0), 0.0, 1.0)
+    cx = s[:, 0] + t * d[:, 0]
+    cy = s[:, 1] + t * d[:, 1]
+    return cx * cx + cy * cy < radius * radius
+
+
+class CircleStore:
+    """Fixed capacity structure-of-arrays store for the game's circles
+
+    Every circle lives in a slot; alive marks the slots in use. Movement, bouncing,
+    hit tests, spawning and despawning all run as array operations over the slots.
+    """
+
+    def __init__(self, capacity, width, height):
+        self.capacity = capacity
+        self.width = width
+        self.height = height
+        self.position = np.zeros((capacity, 2), dtype=np.float64)
+        self.previous = np.zeros((capacity, 2), dtype=np.float64)  # Position before the last move, for interpolation
+        self.velocity = np.zeros((capacity, 2), dtype=np.float64)
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.icon = np.zeros(capacity, dtype=np.int16)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive))
+
+    def clear(self):
+        self.alive[:] = False
+
+    def alive_indices(self):
+        return np.flatnonzero(self.alive)
+
+    def good_count(self):
+        return int(np.count_nonzero(self.alive & (self.state == STATE_GOOD)))
+
+    def spawn(self, num_circles, prob_good, speed_max, num_good_icons, num_bad_icons, rng):
+        """Fill up to num_circles free slots with new random circles drawn from the
+        np.random.Generator rng; returns their indices"""
+        slots = np.flatnonzero(~self.alive)[:num_circles]
+        n = len(slots)
+        if n == 0:
+            return slots
+        good = rng.random(n) < prob_good
+        self.state[slots] = np.where(good, STATE_GOOD, STATE_BAD)
+        # Good icons come first in the icon table, bad ones after them
+        self.icon[slots] = np.where(good,
+                                    rng.integers(0, num_good_icons, size=n),
+                                    num_good_icons + rng.integers(0, num_bad_icons, size=n))
+        self.position[slots, 0] = rng.integers(0, self.width + 1, size=n)
+        self.position[slots, 1] = rng.integers(0, self.height + 1, size=n)
+        self.previous[slots] = self.position[slots]
+        # Non-zero speeds in [-speed_max, -1] U [1, speed_max]
+        speed = rng.integers(1, speed_max + 1, size=(n, 2))
+        sign = np.where(rng.random((n, 2)) < 0.5, -1, 1)
+        self.velocity[slots] = speed * sign
+        self.alive[slots] = True
+        return slots
+
+    def kill(self, indices):
+        self.alive[indices] = False
+
+    def move(self, dt=1.0):
+        """Advance alive circles by velocity*dt and bounce them off the edges"""
+        alive = self.alive
+        pos = self.position
+        vel = self.velocity
+        self.previous[:] = pos
+        pos[alive] += vel[alive] * dt
+        limits = (self.width, self.height)
+        for axis in (0, 1):
+            out = alive & ((pos[:, axis] < 0) | (pos[:, axis] > limits[axis]))
+            vel[out, axis] = -vel[out, axis]
+            np.clip(pos[:, axis], 0, limits[axis], out=pos[:, axis])
+
+    def swept_hits(self, start, end, radius):
+        """Indices of alive circles the pointer touched on its way from start to end
+        while they moved from previous to position"""
+        n = self.capacity
+        inside = segment_hits(np.broadcast_to(np.asarray(start, dtype=np.float64), (n, 2)),
+                              np.broadcast_to(np.asarray(end, dtype=np.float64), (n, 2)),
+                              self.previous, self.position, radius)
+        return np.flatnonzero(inside & self.alive)
+
+    def hits(self, point, radius):
+        """Indices of alive circles within radius of point"""
+        d = self.position - point
+        inside = (d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]) < radius * radius
+        return np.flatnonzero(inside & self.alive)
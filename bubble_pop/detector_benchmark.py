@@ -0,0 +1,108 @@
+"""Latency against accuracy of HandDetector at different inference settings
+
+Runs the same frames through HandDetector once per setting and compares the
+fingertips each one finds with a full resolution, full complexity reference run, so
+kiosks can pick the cheapest setting that still tracks fingertips reliably.
+
+    python bubble_pop/detector_benchmark.py --video hands.mp4 --widths 640 480 320 256 --complexities 0 1
+"""
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from Hand import HandDetector
+
+FINGERTIP_IDS = [4, 8, 12, 16, 20]
+
+
+def load_frames(source, count):
+    """Up to count frames from a video file or camera index"""
+    cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    frames = []
+    while len(frames) < count:
+        success, img = cap.read()
+        if not success:
+            break
+        frames.append(img)
+    cap.release()
+    return frames
+
+
+def run_setting(frames, warmup, **options):
+    """Per-frame latency (ms) and first-hand landmarks (NaN where no hand) for one setting"""
+    detector = HandDetector(maxHands=1, **options)
+    latency = []
+    landmarks = np.full((len(frames), 21, 2), np.nan)
+    for i, img in enumerate(frames):
+        start = time.perf_counter()
+        detector.findHands(img, draw=False)
+        elapsed = (time.perf_counter() - start) * 1000
+        if i >= warmup:
+            latency.append(elapsed)
+        found, handedness, scores = detector.findAllPositions(img)
+        if len(found):
+            landmarks[i] = found[0, :, :2]
+    detector.hands.close()
+    return np.array(latency), landmarks
+
+
+def compare(landmarks, reference):
+    """Detection agreement with the reference and fingertip error in full-frame pixels"""
+    found = ~np.isnan(landmarks[:, 0, 0])
+    expected = ~np.isnan(reference[:, 0, 0])
+    both = found & expected
+    error = np.hypot(*(landmarks[both][:, FINGERTIP_IDS] - reference[both][:, FINGERTIP_IDS]).T).ravel()
+    return dict(detected=float(found.mean()),
+                agreement=float((found == expected).mean()),
+                tip_error_mean=float(error.mean()) if len(error) else float("nan"),
+                tip_error_p95=float(np.percentile(error, 95)) if len(error) else float("nan"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--video", default="0", help="Video file, or camera index to record from")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--widths", type=int, nargs="+", default=[640, 480, 320, 256, 192])
+    parser.add_argument("--complexities", type=int, nargs="+", default=[1, 0])
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    if not frames:
+        parser.error(f"no frames from {args.video}")
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}")
+
+    # The reference also shows what the buffer reuse and read-only input save on their own
+    settings = [("copying", dict(modelComp=1, reuseBuffers=False, readOnly=False))]
+    settings += [(f"comp{comp} w{width}", dict(modelComp=comp, inferenceWidth=width))
+                 for comp in args.complexities for width in args.widths]
+    reference_latency, reference = run_setting(frames, args.warmup, **settings[0][1])
+
+    results = []
+    print(f"{'setting':>14} {'mean ms':>8} {'p50':>7} {'p95':>7} {'detected':>9} {'agree':>7} {'tip px':>7} {'p95 px':>7}")
+    for name, options in settings:
+        if name == "copying":
+            latency, landmarks = reference_latency, reference
+        else:
+            latency, landmarks = run_setting(frames, args.warmup, **options)
+        result = dict(setting=name, **options,
+                      mean_ms=float(latency.mean()),
+                      p50_ms=float(np.percentile(latency, 50)),
+                      p95_ms=float(np.percentile(latency, 95)),
+                      **compare(landmarks, reference))
+        results.append(result)
+        print(f"{name:>14} {result['mean_ms']:8.2f} {result['p50_ms']:7.2f} {result['p95_ms']:7.2f} "
+              f"{result['detected']:9.1%} {result['agreement']:7.1%} "
+              f"{result['tip_error_mean']:7.1f} {result['tip_error_p95']:7.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""Monte Carlo difficulty tuner for Pranic Poppers
+
+Simulates thousands of sessions of the poppers_model rules against synthetic players
+for every point of a parameter grid, and reports score distributions and survival
+rates (still above zero when time runs out). Sessions are simulated together as
+(sessions, circles) arrays and grid points are spread over a process pool. --check
+runs the batch rules and poppers_model.Model side by side on a scripted hand, to
+confirm the batch still plays the same game.
+
+    python bubble_pop/difficulty_tuner.py --prob-good 0.45 0.51 0.6 --points-bad -10 -20 --sessions 2000
+    python bubble_pop/difficulty_tuner.py --check --points-bad -5 -20
+"""
+import argparse
+import concurrent.futures
+import csv
+import itertools
+import json
+import os
+
+import numpy as np
+
+from circle_store import STATE_BAD, STATE_GOOD
+from poppers_model import ACTIVATION_RADIUS, CAMERA_HEIGHT, CAMERA_WIDTH, GAME_DURATION, SPEED_HZ, Model
+
+# Synthetic players: seconds between decisions, chance of going for a good circle
+# rather than just the closest one, hand speed in camera px/s, aim jitter in px, the
+# clearance in px kept from bad circles beyond the activation radius and the chance
+# of pulling the hand out of view, for one reaction delay, when a bad circle is about to hit
+POLICIES = {
+    "novice": dict(reaction_delay=0.6, accuracy=0.70, speed=500.0, jitter=12.0, avoid_margin=10.0, reflex=0.3),
+    "average": dict(reaction_delay=0.4, accuracy=0.85, speed=800.0, jitter=8.0, avoid_margin=25.0, reflex=0.6),
+    "expert": dict(reaction_delay=0.25, accuracy=0.95, speed=1200.0, jitter=4.0, avoid_margin=40.0, reflex=0.85),
+}
+
+DEFAULT_PARAMS = dict(prob_good=0.51, max_circles=40, min_circles=10, circle_speed_sel_max=45,
+                      points_good=3, points_bad=-20, game_duration=GAME_DURATION)
+
+
+class BatchSessions:
+    """The Model rules for many independent sessions at once
+
+    Every per-circle array is (sessions, capacity). The rules follow poppers_model.Model:
+    popping scores and respawns one to three circles per hit, every hit step drops
+    one to three random circles, the count is held between min and max, a board
+    without good circles gets six new ones and speeds ramp up every four seconds.
+    compare_with_model checks the two against each other.
+
+    The synthetic players head for a circle, steer around bad circles on the way and
+    now and then pull their hand out of view when one is about to hit anyway.
+    """
+
+    def __init__(self, sessions, params, policy, rng, capacity=128, dt=1.0 / SPEED_HZ):
+        self.n = sessions
+        self.params = params
+        self.policy = policy
+        self.rng = rng
+        self.capacity = capacity
+        self.dt = dt
+        self.rows = np.arange(sessions)
+
+        self.position = np.zeros((sessions, capacity, 2))
+        self.velocity = np.zeros((sessions, capacity, 2))
+        self.state = np.zeros((sessions, capacity), dtype=np.int8)
+        self.alive = np.zeros((sessions, capacity), dtype=bool)
+        self.born = np.zeros((sessions, capacity), dtype=np.int64)   # Spawns into each slot so far
+        self.score = np.full(sessions, 50, dtype=np.int64)
+        self.active = np.ones(sessions, dtype=bool)
+        self.end_time = np.full(sessions, float(params["game_duration"]))
+        self.time = 0.0
+        self.speed_max = 3
+
+        self.pointer = np.tile([CAMERA_WIDTH / 2, CAMERA_HEIGHT / 2], (sessions, 1)).astype(np.float64)
+        self.target = np.full(sessions, -1)
+        self.target_born = np.zeros(sessions, dtype=np.int64)   # Tells the target from a later circle in its slot
+        self.withdrawn_until = np.zeros(sessions)   # The hand is out of view and hits nothing until then
+        self.next_decision = rng.uniform(0, policy["reaction_delay"], sessions)
+
+        self.spawn(np.full(sessions, 10))
+
+    def spawn(self, counts):
+        """Fill up to counts[s] free slots of each session s with new circles"""
+        counts = np.where(self.active, counts, 0)
+        if not counts.any():
+            return
+        free = ~self.alive
+        new = free & (np.cumsum(free, axis=1) <= counts[:, None])
+        shape = self.alive.shape
+        good = self.rng.random(shape) < self.params["prob_good"]
+        position = np.stack([self.rng.integers(0, CAMERA_WIDTH + 1, shape),
+                             self.rng.integers(0, CAMERA_HEIGHT + 1, shape)], axis=-1)
+        speed = self.rng.integers(1, self.speed_max + 1, shape + (2,))
+        sign = np.where(self.rng.random(shape + (2,)) < 0.5, -1, 1)
+        self.state[new] = np.where(good[new], STATE_GOOD, STATE_BAD)
+        self.position[new] = position[new]
+        self.velocity[new] = (speed * sign)[new]
+        self.born += new
+        self.alive |= new
+
+    def kill_random(self, sessions):
+        """Model.pop_circles' random drop for each session in sessions: one to three
+        draws among the alive circles but the last, repeats counting once, and nothing
+        when only one circle is left"""
+        count = self.alive.sum(axis=1)
+        sessions = sessions & (count > 1)
+        draws = self.rng.integers(0, np.maximum(count - 1, 1)[:, None], (self.n, 3))
+        drawn = np.arange(3) < self.rng.integers(1, 4, self.n)[:, None]
+        rank = np.cumsum(self.alive, axis=1) - 1     # Position of each circle among the alive ones
+        picked = ((rank[:, :, None] == draws[:, None, :]) & drawn[:, None, :]).any(axis=2)
+        self.alive &= ~(sessions[:, None] & picked & self.alive)
+
+    def move_players(self):
+        policy = self.policy
+        # Pick a new target when the reaction delay has passed
+        deciding = self.active & (self.time >= self.next_decision)
+        if deciding.any():
+            d2 = ((self.position - self.pointer[:, None, :]) ** 2).sum(axis=-1)
+            any_target = np.where(self.alive, d2, np.inf)
+            good_target = np.where(self.alive & (self.state == STATE_GOOD), d2, np.inf)
+            careful = self.rng.random(self.n) < policy["accuracy"]
+            choice = np.where(careful[:, None], good_target, any_target).argmin(axis=1)
+            self.target = np.where(deciding, choice, self.target)
+            self.target_born = np.where(deciding, self.born[self.rows, choice], self.target_born)
+            self.next_decision = np.where(deciding, self.time + policy["reaction_delay"], self.next_decision)
+
+        target = np.maximum(self.target, 0)
+        has_target = (self.active & (self.target >= 0) & self.alive[self.rows, target]
+                      & (self.born[self.rows, target] == self.target_born))
+        goal = self.position[self.rows, target]
+        step = goal - self.pointer
+        distance = np.hypot(step[:, 0], step[:, 1])
+        reach = policy["speed"] * self.dt
+        scale = np.where(distance > reach, reach / np.maximum(distance, 1e-9), 1.0)
+        move = np.where(has_target[:, None], step * scale[:, None], 0.0)
+
+        # Steer around bad circles other than the target: every one that will be closer than
+        # the activation radius plus avoid_margin after this step pushes the hand away,
+        # harder the closer it gets, which also pulls an idle hand back out of their way
+        ahead = self.position + self.velocity * (self.dt * SPEED_HZ)
+        away = (self.pointer + move)[:, None, :] - ahead
+        gap = np.maximum(np.hypot(away[..., 0], away[..., 1]), 1e-9)
+        clearance = ACTIVATION_RADIUS + policy["avoid_margin"]
+        threat = self.alive & (self.state == STATE_BAD) & (gap < clearance)
+        threat[self.rows, target] &= ~has_target
+        weight = np.where(threat, (clearance - gap) / policy["avoid_margin"], 0.0)
+        move += (away / gap[..., None] * weight[..., None]).sum(axis=1) * reach
+        length = np.hypot(move[:, 0], move[:, 1])
+        move *= np.minimum(1.0, reach / np.maximum(length, 1e-9))[:, None]
+
+        self.pointer += move * self.active[:, None]
+        self.pointer += self.rng.normal(0.0, policy["jitter"], self.pointer.shape) * self.active[:, None]
+        np.clip(self.pointer, 0, (CAMERA_WIDTH, CAMERA_HEIGHT), out=self.pointer)
+
+        # A bad circle that will be on the hand after this step anyway makes some players pull it back
+        gap = np.hypot(*(self.pointer[:, None, :] - ahead).transpose(2, 0, 1))
+        imminent = (threat & (gap < ACTIVATION_RADIUS)).any(axis=1)
+        withdraw = self.active & imminent & (self.rng.random(self.n) < policy["reflex"])
+        self.withdrawn_until = np.where(withdraw, self.time + policy["reaction_delay"], self.withdrawn_until)
+
+    @property
+    def present(self):
+        """Sessions whose hand is in view and can pop circles"""
+        return self.active & (self.time >= self.withdrawn_until)
+
+    def step(self, pointer=None):
+        """Advance every active session by dt; pointer, if given, is where every
+        session's hand is this step instead of where the synthetic player moves it"""
+        params = self.params
+        if pointer is None:
+            self.move_players()
+        else:
+            self.pointer[:] = pointer
+
+        # Collisions
+        d2 = ((self.position - self.pointer[:, None, :]) ** 2).sum(axis=-1)
+        hit = self.alive & (d2 < ACTIVATION_RADIUS * ACTIVATION_RADIUS) & self.present[:, None]
+        good_hits = (hit & (self.state == STATE_GOOD)).sum(axis=1)
+        bad_hits = hit.sum(axis=1) - good_hits
+        self.score += params["points_good"] * good_hits + params["points_bad"] * bad_hits
+        self.alive &= ~hit
+        any_hit = hit.any(axis=1)
+        if any_hit.any():
+            respawn = (self.rng.integers(1, 4, hit.shape) * hit).sum(axis=1)
+            self.spawn(respawn)
+            self.kill_random(any_hit)
+
+        # Keep the circle count in range and at least one good circle around
+        count = self.alive.sum(axis=1)
+        self.spawn(np.maximum(params["min_circles"] - count, 0))
+        excess = self.alive & (np.cumsum(self.alive, axis=1) > params["max_circles"])
+        self.alive &= ~excess
+        no_good = ~(self.alive & (self.state == STATE_GOOD)).any(axis=1)
+        self.spawn(np.where(no_good, 6, 0))
+
+        # Move and bounce
+        moving = (self.alive & self.active[:, None])[..., None]
+        self.position += self.velocity * moving * (self.dt * SPEED_HZ)
+        for axis, limit in ((0, CAMERA_WIDTH), (1, CAMERA_HEIGHT)):
+            out = (self.position[..., axis] < 0) | (self.position[..., axis] > limit)
+            self.velocity[..., axis] = np.where(out, -self.velocity[..., axis], self.velocity[..., axis])
+            np.clip(self.position[..., axis], 0, limit, out=self.position[..., axis])
+
+        self.time += self.dt
+        new_speed = 2 + int((self.time // 4) * 2)
+        if new_speed <= params["circle_speed_sel_max"]:
+            self.speed_max = new_speed
+
+        lost = self.active & (self.score <= 0)
+        self.end_time[lost] = self.time
+        self.active &= ~lost
+        if self.time >= params["game_duration"]:
+            self.active[:] = False
+
+    def run(self):
+        while self.active.any():
+            self.step()
+        return self.score, self.end_time
+
+
+def simulate(params, policy_name, sessions, seed):
+    """Run one grid point; returns its summary"""
+    rng = np.random.default_rng(seed)
+    batch = BatchSessions(sessions, params, POLICIES[policy_name], rng,
+                          capacity=max(128, 2 * params["max_circles"] + 32))
+    scores, end_time = batch.run()
+    p10, p50, p90 = np.percentile(scores, [10, 50, 90])
+    return dict(params, policy=policy_name, sessions=sessions,
+                mean_score=float(scores.mean()), p10=float(p10), p50=float(p50), p90=float(p90),
+                survival=float((scores > 0).mean()),
+                mean_time_played=float(np.minimum(end_time, params["game_duration"]).mean()))
+
+
+def scripted_pointer(t):
+    """A hand sweeping the screen in a fixed Lissajous path that ignores the circles"""
+    return (CAMERA_WIDTH / 2 + 250 * np.sin(1.3 * t), CAMERA_HEIGHT / 2 + 180 * np.sin(1.7 * t))
+
+
+def compare_with_model(params, sessions=200, seed=0):
+    """Score and time played of BatchSessions next to as many poppers_model.Model games
+
+    Both sides follow scripted_pointer, so they see the same input and only their
+    randomness differs; the summaries should agree within sampling noise.
+    """
+    rng = np.random.default_rng(seed)
+    batch = BatchSessions(sessions, params, POLICIES["average"], rng,
+                          capacity=max(128, 2 * params["max_circles"] + 32))
+    while batch.active.any():
+        batch.step(scripted_pointer(batch.time))
+    batch_scores, batch_time = batch.score, batch.end_time
+
+    model_scores, model_time = [], []
+    for game_rng in rng.spawn(sessions):
+        model = Model(rng=game_rng)
+        for key, value in params.items():
+            setattr(model, key, value)
+        while not model.step(1.0 / SPEED_HZ, [scripted_pointer(model.time)]):
+            pass
+        model_scores.append(model.score)
+        model_time.append(min(model.time, params["game_duration"]))
+
+    summary = {}
+    for name, scores, played in (("batch", batch_scores, batch_time), ("model", np.array(model_scores), np.array(model_time))):
+        p10, p50, p90 = np.percentile(scores, [10, 50, 90])
+        summary[name] = dict(mean_score=float(scores.mean()), p10=float(p10), p50=float(p50), p90=float(p90),
+                             survival=float((scores > 0).mean()), mean_time_played=float(played.mean()))
+    return summary
+
+
+def parameter_grid(args):
+    keys = list(DEFAULT_PARAMS)
+    values = [getattr(args, key) or [DEFAULT_PARAMS[key]] for key in keys]
+    for combo in itertools.product(*values):
+        yield dict(zip(keys, combo))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prob-good", dest="prob_good", type=float, nargs="+")
+    parser.add_argument("--max-circles", dest="max_circles", type=int, nargs="+")
+    parser.add_argument("--min-circles", dest="min_circles", type=int, nargs="+")
+    parser.add_argument("--speed-max", dest="circle_speed_sel_max", type=int, nargs="+")
+    parser.add_argument("--points-good", dest="points_good", type=int, nargs="+")
+    parser.add_argument("--points-bad", dest="points_bad", type=int, nargs="+")
+    parser.add_argument("--duration", dest="game_duration", type=float, nargs="+")
+    parser.add_argument("--policies", nargs="+", default=list(POLICIES), choices=list(POLICIES))
+    parser.add_argument("--sessions", type=int, default=1000, help="Sessions per grid point and policy")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="Write the results table to this file")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--check", action="store_true",
+                        help="Compare the batch rules with poppers_model.Model at every grid point instead")
+    args = parser.parse_args()
+
+    if args.check:
+        columns = ["mean_score", "p10", "p50", "p90", "survival", "mean_time_played"]
+        for params in parameter_grid(args):
+            print(", ".join(f"{key}={value}" for key, value in params.items()))
+            print(" " * 6 + "  ".join(f"{column:>10.10}" for column in columns))
+            for name, summary in compare_with_model(params, min(args.sessions, 200), args.seed).items():
+                print(f"{name:>6}" + "  ".join(f"{summary[column]:>10.4g}" for column in columns))
+        return
+
+    jobs = [(params, policy) for params in parameter_grid(args) for policy in args.policies]
+    seeds = np.random.SeedSequence(args.seed).spawn(len(jobs))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(simulate, params, policy, args.sessions, seed)
+                   for (params, policy), seed in zip(jobs, seeds)]
+        results = [future.result() for future in futures]
+
+    columns = list(DEFAULT_PARAMS) + ["policy", "mean_score", "p10", "p50", "p90", "survival", "mean_time_played"]
+    print("  ".join(f"{column:>10.10}" for column in columns))
+    for result in results:
+        print("  ".join(f"{result[column]:>10.4g}" if isinstance(result[column], float) else f"{result[column]:>10}"
+                        for column in columns))
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import numpy as np
+import pygame
+
+GESTURE_EVENT = pygame.event.custom_type()
+GESTURES = ["open_palm", "climb", "pinch", "fist"]
+
+# Finger chains as landmark ids: wrist, then the four joints of each finger
+FINGER_BASES = np.array([1, 5, 9, 13, 17])
+FINGERTIPS = FINGER_BASES + 3
+# (a, b, c) triples whose angle at b is each finger's MCP, PIP and DIP joint
+_chains = np.stack([np.zeros(5, dtype=np.int64), FINGER_BASES, FINGER_BASES + 1,
+                    FINGER_BASES + 2, FINGER_BASES + 3], axis=1)
+JOINTS = np.stack([_chains[:, 0:3], _chains[:, 1:4], _chains[:, 2:5]], axis=1)  # (5 fingers, 3 joints, 3)
+
+
+class GestureEngine:
+    """Recognises hand gestures from findAllPositions landmark arrays
+
+    Features for every hand are computed in one batch from the 2D landmarks, so the
+    same thresholds work on pixel and normalized coordinates: joint angles per finger,
+    thumb-to-fingertip distances and palm orientation, with lengths in palm sizes
+    (wrist to middle knuckle). A gesture only starts after holding for on_frames
+    frames and only ends after off_frames without it; each start and end is posted as
+    a GESTURE_EVENT with gesture, hand, started and position attributes, and engine set
+    to the engine that posted it, so several engines can share one event queue.
+    """
+
+    def __init__(self, max_hands=2, on_frames=3, off_frames=3, climb_speed=1.5,
+                 pinch_ratio=0.35, extended_angle=160.0, curled_angle=110.0):
+        self.max_hands = max_hands
+        self.on_frames = on_frames
+        self.off_frames = off_frames
+        self.climb_speed = climb_speed      # Palm sizes per second upwards
+        self.pinch_ratio = pinch_ratio      # Thumb to index tip, in palm sizes
+        self.extended_cos = np.cos(np.radians(extended_angle))
+        self.curled_cos = np.cos(np.radians(curled_angle))
+
+        shape = (max_hands, len(GESTURES))
+        self.on_count = np.zeros(shape, dtype=np.int32)
+        self.off_count = np.zeros(shape, dtype=np.int32)
+        self.active = np.zeros(shape, dtype=bool)
+        self.prev_wrist = np.zeros((max_hands, 2))
+        self.prev_present = np.zeros(max_hands, dtype=bool)
+        self.prev_time = None
+        self.position = np.zeros((max_hands, 2))
+
+    def features(self, landmarks):
+        """Per hand: joint angle cosines (H, 5, 3), thumb-to-tip distances (H, 4),
+        palm size (H,), palm facing (H,) and palm angle (H,) from upright, in radians"""
+        points = np.asarray(landmarks, dtype=np.float64)[:, :, :2]
+        a, b, c = points[:, JOINTS[..., 0]], points[:, JOINTS[..., 1]], points[:, JOINTS[..., 2]]
+        u, v = a - b, c - b
+        cosines = (u * v).sum(axis=-1) / np.maximum(np.linalg.norm(u, axis=-1) * np.linalg.norm(v, axis=-1), 1e-9)
+
+        palm = points[:, 9] - points[:, 0]
+        palm_size = np.maximum(np.hypot(palm[:, 0], palm[:, 1]), 1e-9)
+        tips = points[:, FINGERTIPS[1:]] - points[:, FINGERTIPS[:1]]
+        tip_distance = np.hypot(tips[..., 0], tips[..., 1]) / palm_size[:, None]
+
+        # Signed area of the wrist/index/pinky knuckle triangle: near zero edge-on, and its
+        # sign tells the palm from the back of the hand once handedness is known
+        side, across = points[:, 5] - points[:, 0], points[:, 17] - points[:, 0]
+        facing = (side[:, 0] * across[:, 1] - side[:, 1] * across[:, 0]) / (palm_size * palm_size)
+        angle = np.arctan2(palm[:, 0], -palm[:, 1])
+        return cosines, tip_distance, palm_size, facing, angle
+
+    def classify(self, landmarks, t):
+        """Raw (H, len(GESTURES)) gesture flags for this frame, before debouncing"""
+        count = len(landmarks)
+        cosines, tip_distance, palm_size, facing, angle = self.features(landmarks)
+        # A straight joint has an angle near 180 degrees, so a cosine near -1
+        extended = (cosines[:, 1:, 1:] < self.extended_cos).all(axis=-1)   # Four fingers, PIP and DIP
+        curled = (cosines[:, 1:, 1] > self.curled_cos)
+        open_palm = extended.all(axis=1) & (np.abs(facing) > 0.3)
+        fist = curled.all(axis=1)
+        pinch = (tip_distance[:, 0] < self.pinch_ratio) & ~fist
+
+        points = np.asarray(landmarks, dtype=np.float64)[:, :, :2]
+        wrist = points[:, 0]
+        speed = np.zeros(count)
+        if self.prev_time is not None and t > self.prev_time:
+            known = self.prev_present[:count]
+            # Upwards is towards smaller y
+            speed = np.where(known, (self.prev_wrist[:count, 1] - wrist[:, 1]) / (t - self.prev_time), 0.0)
+        climb = open_palm & (speed / palm_size > self.climb_speed)
+
+        self.prev_wrist[:count] = wrist
+        self.prev_present[:] = False
+        self.prev_present[:count] = True
+        self.prev_time = t
+        self.position[:count] = points[:, [0, 5, 9, 13, 17]].mean(axis=1)  # Palm centre
+        return np.stack([open_palm, climb, pinch, fist], axis=1)
+
+    def update(self, landmarks, t):
+        """Debounce this frame's gestures; returns (gesture, hand, started) for every change"""
+        landmarks = np.asarray(landmarks)[:self.max_hands]
+        raw = np.zeros(self.active.shape, dtype=bool)
+        if len(landmarks):
+            raw[:len(landmarks)] = self.classify(landmarks, t)
+        else:
+            self.prev_present[:] = False
+        self.on_count = np.where(raw, self.on_count + 1, 0)
+        self.off_count = np.where(raw, 0, self.off_count + 1)
+        started = ~self.active & (self.on_count >= self.on_frames)
+        ended = self.active & (self.off_count >= self.off_frames)
+        self.active ^= started | ended
+        hands, gestures = np.nonzero(started | ended)
+        return [(GESTURES[g], h, bool(started[h, g])) for h, g in zip(hands.tolist(), gestures.tolist())]
+
+    def post(self, changes):
+        for gesture, hand, started in changes:
+            pygame.event.post(pygame.event.Event(GESTURE_EVENT, gesture=gesture, hand=hand, started=started,
+                                                 position=tuple(self.position[hand].tolist()), engine=self))
+
+    def process(self, landmarks, t):
+        """update() and post() in one go; returns the changes posted"""
+        changes = self.update(landmarks, t)
+        if changes:
+            self.post(changes)
+        return changes
+
@@ -0,0 +1,59 @@
+import numpy as np
+
+
+class HandIdentities:
+    """Stable ids for the hands a detector reports, which it lists in no fixed order
+
+    Each frame's hands are matched to the ones seen before by wrist position, closest
+    pairs first, and only to a hand of the same handedness. A hand with no match
+    within max_distance gets the smallest free id; an id is kept for forget seconds
+    after its hand was last seen, so a player whose hand drops out for a moment gets
+    the same id back when it reappears near where it left.
+    """
+
+    def __init__(self, max_distance=120.0, forget=1.0):
+        self.max_distance = max_distance    # Same units as the wrists passed to assign
+        self.forget = forget
+        self.wrists = {}        # id -> last wrist position
+        self.handedness = {}    # id -> 0 left, 1 right
+        self.seen = {}          # id -> time last seen
+
+    def reset(self):
+        self.wrists.clear()
+        self.handedness.clear()
+        self.seen.clear()
+
+    def assign(self, wrists, handedness, t):
+        """Ids (int array) for hands with the given wrist positions (H, 2) and handedness (H,)"""
+        for id, seen in list(self.seen.items()):
+            if t - seen > self.forget:
+                del self.wrists[id], self.handedness[id], self.seen[id]
+
+        wrists = np.asarray(wrists, dtype=np.float64).reshape(-1, 2)
+        count = len(wrists)
+        ids = np.full(count, -1, dtype=np.int64)
+        known = list(self.wrists)
+        if count and known:
+            previous = np.array([self.wrists[id] for id in known])
+            distance = np.hypot(*(wrists[:, None] - previous[None]).transpose(2, 0, 1))
+            if len(handedness) == count:
+                previous_handedness = np.array([self.handedness[id] for id in known])
+                other = np.asarray(handedness)[:, None] != previous_handedness[None]
+                distance[other & (previous_handedness[None] >= 0)] = np.inf
+            taken = set()
+            for flat in np.argsort(distance, axis=None):
+                i, j = divmod(int(flat), len(known))
+                if distance[i, j] > self.max_distance:
+                    break
+                if ids[i] < 0 and j not in taken:
+                    ids[i] = known[j]
+                    taken.add(j)
+
+        for i in range(count):
+            if ids[i] < 0:
+                ids[i] = next(id for id in range(len(self.seen) + count + 1)
+                              if id not in self.seen and id not in ids)
+            self.wrists[int(ids[i])] = wrists[i]
+            self.handedness[int(ids[i])] = int(handedness[i]) if len(handedness) == count else -1
+            self.seen[int(ids[i])] = t
+        return ids
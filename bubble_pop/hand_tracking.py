@@ -0,0 +1,192 @@
+import math
+
+import cv2
+import numpy as np
+
+from Hand import HandDetector, NUM_LANDMARKS
+
+
+class TrackingHandDetector(HandDetector):
+    """HandDetector that tracks hands between detections instead of searching the whole frame
+
+    Once a hand is found, MediaPipe only sees a box around the last known hands,
+    expanded by roiMargin of its size; it falls back to the full frame when the hands
+    are lost. With detectEvery > 1 MediaPipe runs on one frame in N and the landmarks
+    in between are carried along with sparse Lucas-Kanade optical flow. While fewer than
+    maxHands are tracked the full frame is still searched every searchEvery frames, so
+    a second or third player is picked up while the first one is being tracked.
+    trackingConfidence reports how far the current landmarks can be trusted.
+
+    MediaPipe's video mode tracks hands between calls in its own frame coordinates,
+    which a crop that moves every frame would throw off, so ROI crops go to a second
+    graph in static image mode and only full frames go to the tracking one. ROI sides
+    are rounded up to multiples of roiStep pixels, so the crop, and the buffers
+    prepare() keeps for it, only change size in steps.
+    """
+
+    def __init__(self, mode=False, maxHands=2, modelComp=1, detectionCon=0.5, trackCon=0.5,
+                 roiMargin=0.6, detectEvery=1, minConfidence=0.3, searchEvery=15, roiStep=32, **kwargs):
+        super().__init__(mode, maxHands, modelComp, detectionCon, trackCon, **kwargs)
+        self.roiHands = self.mpHands.Hands(True, maxHands, modelComp, detectionCon, trackCon)
+        self.roiStep = roiStep
+        self.roiMargin = roiMargin
+        self.detectEvery = detectEvery
+        self.minConfidence = minConfidence
+        self.searchEvery = searchEvery
+
+        self.tracked = np.zeros((maxHands, NUM_LANDMARKS, 3), dtype=np.float32)  # Normalized
+        self.trackedCount = 0
+        self.trackingConfidence = 0.0
+        self.trackingSource = "none"  # "full", "roi", "flow" or "none"
+        self.roi = None
+        self.frameCount = 0
+        self.prevGray = None
+        self.flowParams = dict(winSize=(21, 21), maxLevel=2,
+                               criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+    def set_model_complexity(self, modelComp):
+        if modelComp == self.modelComp:
+            return
+        super().set_model_complexity(modelComp)
+        self.roiHands.close()
+        self.roiHands = self.mpHands.Hands(True, self.maxHands, self.modelComp, self.detectionCon, self.trackCon)
+
+    def detect(self, img, roi):
+        """Run MediaPipe on img or its roi; store normalized full-frame landmarks"""
+        h, w = img.shape[:2]
+        x0, y0, x1, y1 = roi if roi is not None else (0, 0, w, h)
+        self.process(img[y0:y1, x0:x1], self.roiHands if roi is not None else None)
+        if not self.results.multi_hand_landmarks:
+            return False
+        count = min(len(self.results.multi_hand_landmarks), self.maxHands)
+        scores = []
+        for i in range(count):
+            hand = self.tracked[i]
+            for id, lm in enumerate(self.results.multi_hand_landmarks[i].landmark):
+                hand[id, 0] = (x0 + lm.x * (x1 - x0)) / w
+                hand[id, 1] = (y0 + lm.y * (y1 - y0)) / h
+                hand[id, 2] = lm.z
+            if self.results.multi_handedness:
+                classification = self.results.multi_handedness[i].classification[0]
+                self.handedness[i] = classification.label == "Right"
+                self.handScores[i] = classification.score
+                scores.append(classification.score)
+        self.trackedCount = count
+        self.trackingConfidence = float(np.mean(scores)) if scores else 1.0
+        return True
+
+    def search_full_frame(self, img, match_distance=0.1):
+        """Detect on the full frame and keep tracked hands it missed; returns True if it found any
+
+        Hands are matched by wrist position (normalized); a tracked hand with no new
+        hand within match_distance is kept after the new ones, up to maxHands.
+        """
+        count = self.trackedCount
+        kept = self.tracked[:count].copy()
+        keptHandedness = self.handedness[:count].copy()
+        keptScores = self.handScores[:count].copy()
+        keptConfidence = self.trackingConfidence
+        if not self.detect(img, None):
+            return False
+        found = self.tracked[:self.trackedCount, 0, :2].copy()
+        for i in range(count):
+            if self.trackedCount >= self.maxHands:
+                break
+            if np.hypot(*(found - kept[i, 0, :2]).T).min() > match_distance:
+                j = self.trackedCount
+                self.tracked[j] = kept[i]
+                self.handedness[j] = keptHandedness[i]
+                self.handScores[j] = keptScores[i]
+                self.trackedCount += 1
+                self.trackingConfidence = min(self.trackingConfidence, keptConfidence)
+        return True
+
+    def propagate(self, gray):
+        """Move the tracked landmarks along with the image using optical flow"""
+        h, w = gray.shape
+        count = self.trackedCount
+        points = (self.tracked[:count, :, :2] * (w, h)).reshape(-1, 1, 2).astype(np.float32)
+        moved, status, err = cv2.calcOpticalFlowPyrLK(self.prevGray, gray, points, None, **self.flowParams)
+        ok = status.reshape(count, NUM_LANDMARKS).astype(bool)
+        moved = moved.reshape(count, NUM_LANDMARKS, 2)
+        # Landmarks the flow lost move with the average of their hand's tracked ones
+        shift = moved - points.reshape(count, NUM_LANDMARKS, 2)
+        good = np.maximum(ok.sum(axis=1, keepdims=True), 1)
+        mean_shift = (shift * ok[..., None]).sum(axis=1, keepdims=True) / good[..., None]
+        shift = np.where(ok[..., None], shift, mean_shift)
+        self.tracked[:count, :, :2] += shift / (w, h)
+        self.trackingConfidence *= float(ok.mean())
+
+    def update_roi(self, img):
+        h, w = img.shape[:2]
+        xy = self.tracked[:self.trackedCount, :, :2].reshape(-1, 2) * (w, h)
+        (x0, y0), (x1, y1) = xy.min(axis=0), xy.max(axis=0)
+        mx, my = (x1 - x0) * self.roiMargin, (y1 - y0) * self.roiMargin
+        # Pad both axes alike, with a floor so a small or edge-on hand keeps enough context
+        pad = max(mx, my, 0.05 * max(w, h))
+        step = self.roiStep
+        bw = min(w, math.ceil((x1 - x0 + 2 * pad) / step) * step)
+        bh = min(h, math.ceil((y1 - y0 + 2 * pad) / step) * step)
+        # Centre the rounded box on the hands, shifted back inside the frame at the edges
+        left = int(min(max(0, (x0 + x1 - bw) / 2), w - bw))
+        top = int(min(max(0, (y0 + y1 - bh) / 2), h - bh))
+        self.roi = (left, top, left + bw, top + bh)
+
+    def findHands(self, img, draw=True):
+        self.frameCount += 1
+        self.inferenceMs = 0.0      # Flow frames run no inference; an ROI miss plus a full search runs two
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if self.detectEvery > 1 else None
+        tracking = self.trackedCount > 0 and self.trackingConfidence >= self.minConfidence
+
+        if tracking and self.prevGray is not None and self.frameCount % self.detectEvery != 0:
+            self.propagate(gray)
+            self.trackingSource = "flow"
+        elif tracking and self.detect(img, self.roi):
+            self.trackingSource = "roi"
+        elif self.detect(img, None):
+            self.trackingSource = "full"
+        else:
+            self.trackedCount = 0
+            self.trackingConfidence = 0.0
+            self.trackingSource = "none"
+            self.roi = None
+
+        if (self.trackingSource in ("roi", "flow") and self.trackedCount < self.maxHands
+                and self.frameCount % self.searchEvery == 0 and self.search_full_frame(img)):
+            self.trackingSource = "full"
+
+        if self.trackedCount:
+            self.update_roi(img)
+        self.prevGray = gray
+
+        if draw:
+            h, w = img.shape[:2]
+            for hand in self.tracked[:self.trackedCount]:
+                for cx, cy in (hand[:, :2] * (w, h)).astype(np.int32).tolist():
+                    cv2.circle(img, (cx, cy), 4, (0, 0, 255), cv2.FILLED)
+            if self.roi is not None:
+                cv2.rectangle(img, self.roi[:2], self.roi[2:], (0, 255, 0), 2)
+        return img
+
+    def numHands(self):
+        return self.trackedCount
+
+    def findPosition(self, img, handNo=0, draw=True):
+        lmList = []
+        if self.trackedCount > handNo:
+            h, w = img.shape[:2]
+            points = (self.tracked[handNo, :, :2] * (w, h)).astype(np.int32)
+            for id, (cx, cy) in enumerate(points.tolist()):
+                lmList.append([id, cx, cy])
+                if draw:
+                    cv2.circle(img, (cx, cy), 15, (255, 0, 255), cv2.FILLED)
+        return lmList
+
+    def findAllPositions(self, img=None, normalized=False):
+        count = self.trackedCount
+        self.lmArray[:count] = self.tracked[:count]
+        if not normalized:
+            h, w = img.shape[:2]
+            self.lmArray[:count, :, 0] *= w
+            self.lmArray[:count, :, 1] *= h
+        return self.lmArray[:count], self.handedness[:count], self.handScores[:count]
@@ -0,0 +1,289 @@
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+NUM_LANDMARKS = 21
+BUFFER_SHAPES = 4   # Inference sizes rgb_for_inference keeps buffers for at once
+
+# Pairs of landmark ids joined when drawing a hand (same as mp.solutions.hands.HAND_CONNECTIONS)
+HAND_CONNECTIONS = [
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+]
+
+
+class SharedFrameRing:
+    """Fixed ring of BGR frames in shared memory, written by one process and read by another"""
+
+    def __init__(self, shape, slots=3, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=frame_bytes * slots)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, frame, seq):
+        """Copy frame into the slot for seq"""
+        self.frames[seq % self.slots][...] = frame
+
+    def read(self, seq, out):
+        """Copy the frame for seq into out"""
+        out[...] = self.frames[seq % self.slots]
+        return out
+
+    def close(self):
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def hand_arrays(output):
+    """(landmarks, handedness, scores) arrays from a MediaPipe Hands result"""
+    landmarks = np.zeros((0, NUM_LANDMARKS, 3), dtype=np.float32)
+    handedness = np.zeros(0, dtype=np.int8)
+    scores = np.zeros(0, dtype=np.float32)
+    if output.multi_hand_landmarks:
+        landmarks = np.array([[(lm.x, lm.y, lm.z) for lm in handLms.landmark]
+                              for handLms in output.multi_hand_landmarks], dtype=np.float32)
+        if output.multi_handedness:
+            handedness = np.array([h.classification[0].label == "Right"
+                                   for h in output.multi_handedness], dtype=np.int8)
+            scores = np.array([h.classification[0].score for h in output.multi_handedness],
+                              dtype=np.float32)
+    return landmarks, handedness, scores
+
+
+def inference_size(shape, width):
+    """(width, height) to run inference at: shape's size scaled down to width, same aspect"""
+    h, w = shape[:2]
+    if not width or width >= w:
+        return w, h
+    return width, max(1, round(h * width / w))
+
+
+def rgb_for_inference(frame, width, buffers=None, read_only=True):
+    """frame downscaled to width and converted to RGB, the array MediaPipe runs on
+
+    buffers is a dict the caller keeps between frames; the result is written into
+    arrays held there per size, the few most recent sizes at a time. Without it
+    fresh arrays are allocated. read_only lets MediaPipe use the array without
+    copying it.
+    """
+    size = inference_size(frame.shape, width)
+    if buffers is None:
+        if size != (frame.shape[1], frame.shape[0]):
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    else:
+        shape = (size[1], size[0], 3)
+        if shape not in buffers:
+            if len(buffers) >= BUFFER_SHAPES:
+                del buffers[next(iter(buffers))]
+            buffers[shape] = (np.empty(shape, dtype=np.uint8), np.empty(shape, dtype=np.uint8))
+        small, rgb = buffers[shape]
+        rgb.flags.writeable = True
+        if size != (frame.shape[1], frame.shape[0]):
+            cv2.resize(frame, size, dst=small, interpolation=cv2.INTER_AREA)
+            frame = small
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+    rgb.flags.writeable = not read_only
+    return rgb
+
+
+def _inference_worker(ring_name, shape, slots, slot_seqs, latest_seq, frame_ready, results, stop,
+                      settings, mode, maxHands, detectionCon, trackCon):
+    import mediapipe as mp_lib
+
+    ring = SharedFrameRing(shape, slots, name=ring_name)
+    modelComp = settings[0]
+    hands = mp_lib.solutions.hands.Hands(mode, maxHands, modelComp, detectionCon, trackCon)
+    frame = np.empty(shape, dtype=np.uint8)
+    buffers = {}
+    done_seq = 0
+    try:
+        while not stop.is_set():
+            if not frame_ready.wait(0.1):
+                continue
+            frame_ready.clear()
+            seq = latest_seq.value
+            if seq <= done_seq:
+                continue
+            ring.read(seq, frame)
+            # The producer may have lapped the ring while we copied; skip torn frames
+            if slot_seqs[seq % slots] != seq:
+                continue
+            # settings holds the model complexity and inference width the parent asks for
+            if settings[0] != modelComp:
+                hands.close()
+                modelComp = settings[0]
+                hands = mp_lib.solutions.hands.Hands(mode, maxHands, modelComp, detectionCon, trackCon)
+            start = time.perf_counter()
+            imgRGB = rgb_for_inference(frame, settings[1], buffers)
+            landmarks, handedness, scores = hand_arrays(hands.process(imgRGB))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            done_seq = seq
+            try:
+                results.put_nowait((seq, landmarks, handedness, scores, elapsed_ms))
+            except queue.Full:
+                pass
+    finally:
+        hands.close()
+        ring.close()
+
+
+class AsyncHandDetector:
+    """Drop-in for HandDetector that runs MediaPipe in a worker process
+
+    Frames go to the worker through a shared memory ring, so findHands never waits on
+    inference. findPosition answers with the latest landmarks available and
+    result_seq tells which submitted frame they belong to.
+    """
+
+    def __init__(self, mode=False, maxHands=2, modelComp=1, detectionCon=0.5, trackCon=0.5, slots=3,
+                 inferenceWidth=None):
+        self.mode = mode
+        self.maxHands = maxHands
+        self.detectionCon = detectionCon
+        self.trackCon = trackCon
+        self.modelComp = modelComp
+        self.inferenceWidth = inferenceWidth
+        self.slots = slots
+        self.settings = None        # Shared [modelComp, inferenceWidth] read by the worker every frame
+        self.inferenceMs = 0.0      # How long the worker took on the newest result
+
+        self.ctx = mp.get_context("spawn")
+        self.ring = None
+        self.process = None
+        self.seq = 0
+        self.result_seq = 0
+        self.landmarks = np.zeros((0, NUM_LANDMARKS, 3), dtype=np.float32)
+        self.handedness = np.zeros(0, dtype=np.int8)
+        self.handScores = np.zeros(0, dtype=np.float32)
+        self.lmArray = np.zeros((maxHands, NUM_LANDMARKS, 3), dtype=np.float32)
+
+    def start(self, shape):
+        self.ring = SharedFrameRing(shape, self.slots)
+        self.slot_seqs = self.ctx.Array('q', self.slots, lock=False)
+        self.latest_seq = self.ctx.Value('q', 0, lock=False)
+        self.frame_ready = self.ctx.Event()
+        self.stop = self.ctx.Event()
+        self.results = self.ctx.Queue(maxsize=4)
+        self.settings = self.ctx.Array('i', [self.modelComp, self.inferenceWidth or 0], lock=False)
+        self.process = self.ctx.Process(
+            target=_inference_worker,
+            args=(self.ring.name, self.ring.shape, self.slots, self.slot_seqs, self.latest_seq,
+                  self.frame_ready, self.results, self.stop, self.settings,
+                  self.mode, self.maxHands, self.detectionCon, self.trackCon),
+            daemon=True)
+        self.process.start()
+
+    def set_model_complexity(self, modelComp):
+        """Same as HandDetector.set_model_complexity; the worker swaps graphs before its next frame"""
+        self.modelComp = modelComp
+        if self.settings is not None:
+            self.settings[0] = modelComp
+
+    def set_inference_width(self, width):
+        self.inferenceWidth = width
+        if self.settings is not None:
+            self.settings[1] = width or 0
+
+    def submit(self, img, seq=None):
+        """Hand a frame to the worker; returns the sequence number it was given"""
+        if self.process is None:
+            self.start(img.shape)
+        self.seq = self.seq + 1 if seq is None else seq
+        slot = self.seq % self.slots
+        # Mark the slot as being written so the worker can spot a torn read
+        self.slot_seqs[slot] = -1
+        self.ring.write(img, self.seq)
+        self.slot_seqs[slot] = self.seq
+        self.latest_seq.value = self.seq
+        self.frame_ready.set()
+        return self.seq
+
+    def check_alive(self):
+        """Raise if the worker has died (a MediaPipe import or graph error, say), rather
+        than let the game run on without hands"""
+        if self.process is not None and not self.process.is_alive():
+            raise RuntimeError(f"Hand inference worker exited with code {self.process.exitcode}")
+
+    def poll(self):
+        """Take the newest result from the worker, if there is one"""
+        self.check_alive()
+        updated = False
+        while True:
+            try:
+                seq, landmarks, handedness, scores, elapsed_ms = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if seq > self.result_seq:
+                self.result_seq, self.landmarks = seq, landmarks
+                self.handedness, self.handScores = handedness, scores
+                self.inferenceMs = elapsed_ms
+                updated = True
+        return updated
+
+    def findHands(self, img, draw=True, seq=None):
+        self.submit(img, seq)
+        self.poll()
+        if draw:
+            h, w, c = img.shape
+            for hand in self.landmarks:
+                points = [tuple(p) for p in (hand[:, :2] * (w, h)).astype(np.int32).tolist()]
+                for a, b in HAND_CONNECTIONS:
+                    cv2.line(img, points[a], points[b], (255, 255, 255), 2)
+                for point in points:
+                    cv2.circle(img, point, 4, (0, 0, 255), cv2.FILLED)
+        return img
+
+    def numHands(self):
+        return len(self.landmarks)
+
+    def findPosition(self, img, handNo=0, draw=True):
+        lmList = []
+        if len(self.landmarks) > handNo:
+            h, w, c = img.shape
+            points = (self.landmarks[handNo, :, :2] * (w, h)).astype(np.int32)
+            for id, (cx, cy) in enumerate(points.tolist()):
+                lmList.append([id, cx, cy])
+                if draw:
+                    cv2.circle(img, (cx, cy), 15, (255, 0, 255), cv2.FILLED)
+        return lmList
+
+    def findAllPositions(self, img=None, normalized=False):
+        """Same contract as HandDetector.findAllPositions"""
+        count = min(len(self.landmarks), self.maxHands)
+        self.lmArray[:count] = self.landmarks[:count]
+        if not normalized:
+            h, w = img.shape[:2]
+            self.lmArray[:count, :, 0] *= w
+            self.lmArray[:count, :, 1] *= h
+        return self.lmArray[:count], self.handedness[:count], self.handScores[:count]
+
+    def close(self):
+        if self.process is None:
+            return
+        self.stop.set()
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.results.close()
+        self.ring.close()
+        self.process = None
@@ -0,0 +1,199 @@
+import collections
+import multiprocessing as mp
+import queue
+import time
+
+from hand_worker import AsyncHandDetector, SharedFrameRing, hand_arrays, rgb_for_inference
+
+
+def _pool_worker(worker_id, tasks, results, stop, mode, maxHands, detectionCon, trackCon):
+    import mediapipe as mp_lib
+
+    rings = {}
+    graphs = {}     # One Hands graph per station, so tracking state never mixes cameras
+    buffers = {}
+    try:
+        while not stop.is_set():
+            try:
+                station, ring_name, shape, slots, slot, seq, modelComp, width = tasks.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if ring_name not in rings:
+                rings[ring_name] = SharedFrameRing(shape, slots, name=ring_name)
+            # Stations pick their own model complexity; swap the graph when it changes
+            if station in graphs and graphs[station][0] != modelComp:
+                graphs.pop(station)[1].close()
+            if station not in graphs:
+                graphs[station] = (modelComp, mp_lib.solutions.hands.Hands(mode, maxHands, modelComp,
+                                                                           detectionCon, trackCon))
+            start = time.perf_counter()
+            # The host never writes a slot while it is out for inference, so no copy is needed
+            imgRGB = rgb_for_inference(rings[ring_name].frames[slot], width, buffers)
+            landmarks, handedness, scores = hand_arrays(graphs[station][1].process(imgRGB))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            results.put((worker_id, station, seq, landmarks, handedness, scores, elapsed_ms))
+    finally:
+        for modelComp, graph in graphs.values():
+            graph.close()
+        for ring in rings.values():
+            ring.close()
+
+
+class PooledHandDetector(AsyncHandDetector):
+    """AsyncHandDetector for one station, served by a shared InferencePool
+
+    Each station holds at most one frame waiting and one out for inference; a newer
+    frame replaces the waiting one, which counts as dropped.
+    """
+
+    def __init__(self, pool, station_id):
+        super().__init__(pool.mode, pool.maxHands, pool.modelComp, pool.detectionCon, pool.trackCon, slots=2)
+        self.pool = pool
+        self.station_id = station_id
+        self.pending = None         # (seq, slot, submit time) of the frame waiting for a worker
+        self.inflight = None        # Slot out for inference
+        self.delivered = None       # Newest result not yet taken by poll()
+        self.last_dispatch = 0      # Pool dispatch count when this station was last served
+        self.last_worker = None
+        self.served = 0
+        self.dropped = 0
+        self.closed = False
+
+    def start(self, shape):
+        self.ring = SharedFrameRing(shape, self.slots)
+
+    def submit(self, img, seq=None):
+        if self.ring is None:
+            self.start(img.shape)
+        self.seq = self.seq + 1 if seq is None else seq
+        slot = next(s for s in range(self.slots) if s != self.inflight)
+        self.ring.write(img, slot)
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = (self.seq, slot, time.perf_counter())
+        return self.seq
+
+    def deliver(self, seq, landmarks, handedness, scores, elapsed_ms):
+        self.inflight = None
+        if seq > self.result_seq:
+            self.delivered = (seq, landmarks, handedness, scores, elapsed_ms)
+
+    def poll(self):
+        self.pool.collect()
+        if self.delivered is None:
+            return False
+        self.result_seq, self.landmarks, self.handedness, self.handScores, self.inferenceMs = self.delivered
+        self.delivered = None
+        return True
+
+    def close(self):
+        # The ring stays until the pool shuts down, as a worker may still be reading it
+        self.closed = True
+        self.pending = None
+
+
+class InferencePool:
+    """A few MediaPipe worker processes shared by any number of stations
+
+    Call detector() once per station and use the result like an AsyncHandDetector,
+    then pump() once per host frame, after every station has submitted. pump() gives
+    each free worker the waiting frame of the station served least recently,
+    preferring the worker that served that station last so its graph keeps tracking.
+    Dispatching only there, rather than on every submit, keeps the station that
+    happens to submit first from taking every worker that frees up. Frames older than
+    max_age seconds are dropped instead of run, so a busy pool always works on fresh
+    frames and no station starves.
+    """
+
+    def __init__(self, workers=2, maxHands=2, modelComp=1, detectionCon=0.5, trackCon=0.5, max_age=0.1,
+                 mode=False):
+        self.mode = mode
+        self.maxHands = maxHands
+        self.modelComp = modelComp
+        self.detectionCon = detectionCon
+        self.trackCon = trackCon
+        self.max_age = max_age
+        self.stations = []
+
+        self.ctx = mp.get_context("spawn")
+        self.results = self.ctx.Queue()
+        self.stop = self.ctx.Event()
+        self.tasks = [self.ctx.Queue() for _ in range(workers)]
+        self.processes = [
+            self.ctx.Process(target=_pool_worker,
+                             args=(i, self.tasks[i], self.results, self.stop,
+                                   mode, maxHands, detectionCon, trackCon),
+                             daemon=True)
+            for i in range(workers)]
+        for process in self.processes:
+            process.start()
+        self.idle = collections.deque(range(workers))
+        self.dispatches = 0
+
+    def detector(self):
+        station = PooledHandDetector(self, len(self.stations))
+        self.stations.append(station)
+        return station
+
+    def check_alive(self):
+        """Raise if a worker has died, rather than let its stations wait forever"""
+        for i, process in enumerate(self.processes):
+            if not process.is_alive():
+                raise RuntimeError(f"Inference pool worker {i} exited with code {process.exitcode}")
+
+    def collect(self):
+        """Hand finished results to their stations and mark their workers idle"""
+        self.check_alive()
+        while True:
+            try:
+                worker, station, seq, landmarks, handedness, scores, elapsed_ms = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.idle.append(worker)
+            self.stations[station].deliver(seq, landmarks, handedness, scores, elapsed_ms)
+
+    def pump(self):
+        """Collect finished results and give every idle worker a frame"""
+        self.collect()
+        now = time.perf_counter()
+        for station in self.stations:
+            if station.pending is not None and now - station.pending[2] > self.max_age:
+                station.pending = None
+                station.dropped += 1
+        while self.idle:
+            ready = [s for s in self.stations if s.pending is not None and s.inflight is None and not s.closed]
+            if not ready:
+                break
+            station = min(ready, key=lambda s: s.last_dispatch)
+            if station.last_worker in self.idle:
+                self.idle.remove(station.last_worker)
+                worker = station.last_worker
+            else:
+                worker = self.idle.popleft()
+            seq, slot, submitted = station.pending
+            station.pending = None
+            station.inflight = slot
+            self.dispatches += 1
+            station.last_dispatch = self.dispatches
+            station.last_worker = worker
+            station.served += 1
+            ring = station.ring
+            self.tasks[worker].put((station.station_id, ring.name, ring.shape, ring.slots, slot, seq,
+                                    station.modelComp, station.inferenceWidth))
+
+    def stats(self):
+        """Frames run and dropped per station"""
+        return [dict(station=s.station_id, served=s.served, dropped=s.dropped) for s in self.stations]
+
+    def close(self):
+        self.stop.set()
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        for q in self.tasks + [self.results]:
+            q.close()
+        for station in self.stations:
+            if station.ring is not None:
+                station.ring.close()
+                station.ring = None
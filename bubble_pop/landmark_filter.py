@@ -0,0 +1,65 @@
+import math
+
+import numpy as np
+
+
+class OneEuroFilter:
+    """One Euro filter over whole landmark arrays, with forward prediction
+
+    Every element of the array is filtered independently: a low-pass whose cutoff
+    rises with speed, so slow movement is smoothed hard and fast movement lags little.
+    predict() extrapolates the filtered positions with the filtered velocity, which
+    makes up for the capture-plus-inference latency. Given an id for every row (hand),
+    state follows each id from sample to sample and a row whose id is new starts from
+    its sample with no velocity; without ids the filter restarts whenever the array
+    shape changes.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.007, d_cutoff=1.0, max_prediction=0.2):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.max_prediction = max_prediction
+        self.reset()
+
+    def reset(self):
+        self.x = None
+        self.dx = None
+        self.t = None
+        self.ids = None
+
+    @staticmethod
+    def alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, t, ids=None):
+        """Filter a new sample x taken at time t (seconds); returns the filtered array"""
+        x = np.asarray(x, dtype=np.float64)
+        if ids is not None and self.ids is not None and self.x.shape[1:] == x.shape[1:]:
+            rows = {id: i for i, id in enumerate(self.ids)}
+            x_prev, dx_prev = x.copy(), np.zeros_like(x)
+            for i, id in enumerate(ids):
+                if id in rows:
+                    x_prev[i], dx_prev[i] = self.x[rows[id]], self.dx[rows[id]]
+            self.x, self.dx = x_prev, dx_prev
+        self.ids = None if ids is None else list(ids)
+        if self.x is None or self.x.shape != x.shape or t <= self.t:
+            self.x = x.copy()
+            self.dx = np.zeros_like(x)
+            self.t = t
+            return self.x
+        dt = t - self.t
+        self.t = t
+        a_d = self.alpha(self.d_cutoff, dt)
+        self.dx += a_d * ((x - self.x) / dt - self.dx)
+        cutoff = self.min_cutoff + self.beta * np.abs(self.dx)
+        a = 1.0 / (1.0 + 1.0 / (2 * np.pi * cutoff * dt))
+        self.x += a * (x - self.x)
+        return self.x
+
+    def predict(self, latency):
+        """Filtered positions pushed forward by latency seconds along the filtered velocity"""
+        if self.x is None:
+            return None
+        return self.x + self.dx * min(max(latency, 0.0), self.max_prediction)
@@ -0,0 +1,168 @@
+"""Compact binary recordings of hand landmarks
+
+A trace file is a 16 byte header followed by fixed-size records, one per detected
+frame: timestamp, frame sequence, hand count, per-hand handedness and score, and a
+(max_hands, 21, 3) float32 block of normalized landmarks. Records are fixed size, so
+a trace is replayed through np.memmap without any parsing.
+"""
+import os
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b"LMTR"
+VERSION = 1
+HEADER = struct.Struct("<4sHHH6x")
+NUM_LANDMARKS = 21
+
+
+def record_dtype(max_hands, num_landmarks=NUM_LANDMARKS):
+    return np.dtype([
+        ("timestamp", "<f8"),
+        ("seq", "<u8"),
+        ("count", "<u4"),
+        ("handedness", "i1", (max_hands,)),
+        ("scores", "<f4", (max_hands,)),
+        ("landmarks", "<f4", (max_hands, num_landmarks, 3)),
+    ])
+
+
+class TraceWriter:
+    """Appends one record per frame to a trace file"""
+
+    def __init__(self, path, max_hands=2):
+        self.max_hands = max_hands
+        self.dtype = record_dtype(max_hands)
+        self.record = np.zeros(1, dtype=self.dtype)
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, max_hands, NUM_LANDMARKS))
+        self.frames = 0
+
+    def write(self, timestamp, landmarks, handedness=None, scores=None, seq=None):
+        """landmarks is (hands, 21, 3) normalized; extra hands beyond max_hands are dropped"""
+        rec = self.record
+        count = min(len(landmarks), self.max_hands)
+        rec["timestamp"] = timestamp
+        rec["seq"] = self.frames if seq is None else seq
+        rec["count"] = count
+        rec["landmarks"][0, :count] = landmarks[:count]
+        rec["landmarks"][0, count:] = 0
+        rec["handedness"][0] = 0
+        rec["scores"][0] = 0
+        if handedness is not None:
+            rec["handedness"][0, :count] = handedness[:count]
+        if scores is not None:
+            rec["scores"][0, :count] = scores[:count]
+        self.file.write(self.record.tobytes())
+        self.frames += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceReader:
+    """Memory-mapped view over a trace file
+
+    A partial record at the end, left by a recorder killed mid-write, is ignored.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, max_hands, num_landmarks = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} landmark trace")
+        self.max_hands = max_hands
+        self.dtype = record_dtype(max_hands, num_landmarks)
+        count = (os.path.getsize(path) - HEADER.size) // self.dtype.itemsize
+        if count == 0:
+            raise ValueError(f"{path} holds no landmark records")
+        self.records = np.memmap(path, dtype=self.dtype, mode="r", offset=HEADER.size, shape=(count,))
+        self.timestamps = self.records["timestamp"]
+        self.seqs = self.records["seq"]
+        self.counts = self.records["count"]
+        self.handedness = self.records["handedness"]
+        self.scores = self.records["scores"]
+        self.landmarks = self.records["landmarks"]
+
+    def __len__(self):
+        return len(self.records)
+
+
+class TraceDetector:
+    """HandDetector stand-in replaying normalized landmarks (frames, hands, 21, 3)
+
+    counts[i] is how many hands are valid in frame i. With timestamps (seconds, one
+    per frame) findHands shows the frame that was current that long after the first
+    findHands call, so a trace plays back at the rate it was recorded however often
+    records were written; without them each call moves on to the next frame. Either
+    way the trace loops at the end.
+    """
+
+    def __init__(self, landmarks, counts, handedness=None, scores=None, maxHands=2, timestamps=None):
+        self.trace = landmarks
+        self.counts = counts
+        self.timestamps = None
+        if timestamps is not None and len(timestamps) > 1:
+            self.timestamps = np.asarray(timestamps, dtype=np.float64) - timestamps[0]
+            # Loop after the last frame has been shown for a typical frame gap
+            self.duration = self.timestamps[-1] + float(np.median(np.diff(self.timestamps)))
+        self.start_time = None
+        self.trace_handedness = handedness
+        self.trace_scores = scores
+        self.maxHands = maxHands
+        self.frame = -1
+        self.landmarks = np.zeros((0, NUM_LANDMARKS, 3), dtype=np.float32)
+        self.lmArray = np.zeros((maxHands, NUM_LANDMARKS, 3), dtype=np.float32)
+        self.handedness = np.ones(maxHands, dtype=np.int8)
+        self.handScores = np.ones(maxHands, dtype=np.float32)
+        self.inferenceMs = 0.0      # Replays run no inference
+
+    @classmethod
+    def from_file(cls, path, realtime=True):
+        """realtime replays by the recorded timestamps, else one record per findHands call"""
+        reader = TraceReader(path)
+        return cls(reader.landmarks, reader.counts, reader.handedness, reader.scores, maxHands=reader.max_hands,
+                   timestamps=reader.timestamps if realtime else None)
+
+    def findHands(self, img, draw=True):
+        if self.timestamps is None:
+            self.frame = (self.frame + 1) % len(self.counts)
+        else:
+            now = time.perf_counter()
+            if self.start_time is None:
+                self.start_time = now
+            elapsed = (now - self.start_time) % self.duration
+            self.frame = int(np.searchsorted(self.timestamps, elapsed, side="right")) - 1
+        count = min(int(self.counts[self.frame]), self.maxHands)
+        self.landmarks = self.trace[self.frame, :count]
+        if self.trace_handedness is not None:
+            self.handedness[:count] = self.trace_handedness[self.frame, :count]
+            self.handScores[:count] = self.trace_scores[self.frame, :count]
+        return img
+
+    def numHands(self):
+        return len(self.landmarks)
+
+    def findPosition(self, img, handNo=0, draw=True):
+        lmList = []
+        if len(self.landmarks) > handNo:
+            h, w = img.shape[:2]
+            points = (self.landmarks[handNo, :, :2] * (w, h)).astype(np.int32)
+            lmList = [[id, cx, cy] for id, (cx, cy) in enumerate(points.tolist())]
+        return lmList
+
+    def findAllPositions(self, img=None, normalized=False):
+        count = len(self.landmarks)
+        self.lmArray[:count] = self.landmarks
+        if not normalized:
+            h, w = img.shape[:2]
+            self.lmArray[:count, :, 0] *= w
+            self.lmArray[:count, :, 1] *= h
+        return self.lmArray[:count], self.handedness[:count], self.handScores[:count]
@@ -0,0 +1,162 @@
+"""Game rules of Pranic Poppers, free of pygame, cameras and the wall clock
+
+All randomness comes from the injected np.random.Generator and all time from the dt
+passed to step(), so a seeded Model replays bit for bit and can be stepped in tight
+loops by tests, benchmarks and offline tools.
+"""
+import numpy as np
+
+from circle_store import CircleStore, STATE_GOOD, segment_hits
+from spatial_grid import UniformGrid
+
+CAMERA_WIDTH, CAMERA_HEIGHT = 640, 480
+
+ACTIVATION_RADIUS = 50  # Radius for finger activation
+CIRCLE_CAPACITY = 256   # Slots in the circle store, well above max_circles plus respawns
+GAME_DURATION = 60      # Game lasts for 20 seconds
+SPEED_HZ = 30           # Circle speeds are in pixels per 1/SPEED_HZ seconds
+
+
+class Model:
+    def __init__(self, capacity=CIRCLE_CAPACITY, rng=None, seed=None):
+        """rng is the np.random.Generator behind every random choice; seed builds one"""
+        self.capacity = capacity
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.reset_game()
+
+    def reset_game(self):
+        self.max_circles = 40
+        self.min_circles = 10
+        self.circle_speed_max = 3
+        self.circle_speed_sel_max = 45
+        self.score = 50
+        self.points_good = 3
+        self.points_bad = -20
+        self.prob_good = .51
+        self.game_duration = GAME_DURATION
+        self.time = 0.0         # Seconds of simulated play
+        self.good_foods = ['apple', 'lemon', 'carrot', 'sprouts', 'watermelon', 'banana']
+        self.bad_foods = ['fries', 'hamburger', 'onion', 'pizza', 'garlic', 'chicken']
+        # Icon ids index into this table: good foods first, then bad foods
+        self.icons = self.good_foods + self.bad_foods
+        self.circles = CircleStore(self.capacity, CAMERA_WIDTH, CAMERA_HEIGHT)
+        self.grid = UniformGrid(CAMERA_WIDTH, CAMERA_HEIGHT, ACTIVATION_RADIUS)
+        self.hand_scores = {}   # Points won or lost by each hand in multi-hand mode
+        self.create_circles(10)  # Start with 5 to 9 circles
+
+    @property
+    def time_left(self):
+        return self.game_duration - self.time
+
+    @property
+    def game_over(self):
+        return self.time >= self.game_duration or self.score <= 0
+
+    def step(self, dt, pointer_positions=(), pointer_hands=None, prev_pointers=None):
+        """Advance the game by dt seconds with the given pointers (camera coordinates)
+
+        Without pointer_hands only the first pointer pops circles, like the single
+        hand game; with it every pointer does and points go to its hand. prev_pointers,
+        if given, holds where each pointer was at the previous step, for swept
+        collisions; a pointer with no previous position passes its current one.
+        Returns True once the game is over.
+        """
+        pointers = np.asarray(pointer_positions, dtype=np.float64).reshape(-1, 2)
+        if prev_pointers is not None:
+            prev_pointers = np.asarray(prev_pointers, dtype=np.float64).reshape(-1, 2)
+            if prev_pointers.shape != pointers.shape:
+                prev_pointers = None
+        if pointer_hands is not None:
+            if len(pointers):
+                self.check_collisions_multi(pointers, pointer_hands, prev_pointers)
+        elif len(pointers):
+            self.check_collisions(pointers[0], None if prev_pointers is None else prev_pointers[0])
+
+        self.check_circles_count()
+        self.check_good_count()
+        self.update_circles(dt)
+
+        self.time += dt
+        self.update_circle_speed()
+        return self.game_over
+
+    def update_circle_speed(self):
+        increase_every_secs = 4
+        speed_scaler = 2
+        new_speed = 2 + int((self.time//increase_every_secs)*speed_scaler)
+        if new_speed <= self.circle_speed_sel_max:
+            self.circle_speed_max = new_speed
+
+    def create_circles(self, num_circles):
+        return self.circles.spawn(num_circles, self.prob_good, self.circle_speed_max,
+                                  len(self.good_foods), len(self.bad_foods), self.rng)
+
+    def update_circles(self, dt=1.0 / SPEED_HZ):
+        self.circles.move(dt * SPEED_HZ)
+
+    def check_collisions(self, finger_pos, prev_finger_pos=None):
+        """With prev_finger_pos, test the whole path swept since the last step"""
+        if prev_finger_pos is None:
+            self.pop_circles(self.circles.hits(finger_pos, ACTIVATION_RADIUS))
+        else:
+            self.pop_circles(self.circles.swept_hits(prev_finger_pos, finger_pos, ACTIVATION_RADIUS))
+
+    def check_collisions_multi(self, pointers, pointer_hands, prev_pointers=None):
+        """Collide every pointer (fingertip of any hand) with the circles through the grid
+
+        A circle touched by several pointers is credited to the first of them. With
+        prev_pointers each pointer's path since the last step is tested instead.
+        """
+        circles = self.circles
+        self.grid.build(circles.position, circles.alive_indices())
+        if prev_pointers is None:
+            pointer_idx, hit = self.grid.query(pointers, ACTIVATION_RADIUS)
+        else:
+            pointers = np.asarray(pointers, dtype=np.float64)
+            prev_pointers = np.asarray(prev_pointers, dtype=np.float64)
+            # Look around each path's midpoint far enough to cover the path and the circles' motion
+            half_path = np.hypot(*(pointers - prev_pointers).T).max() / 2
+            alive = circles.alive_indices()
+            circle_step = np.hypot(*(circles.position[alive] - circles.previous[alive]).T).max(initial=0.0)
+            middle = (pointers + prev_pointers) / 2
+            middle, pointer_idx, hit = self.grid.candidates(middle, ACTIVATION_RADIUS + half_path + circle_step)
+            inside = segment_hits(prev_pointers[pointer_idx], pointers[pointer_idx],
+                                  circles.previous[hit], circles.position[hit], ACTIVATION_RADIUS)
+            pointer_idx, hit = pointer_idx[inside], hit[inside]
+        if len(hit) == 0:
+            return
+        hit, first = np.unique(hit, return_index=True)
+        hands = np.asarray(pointer_hands)[pointer_idx[first]]
+        self.pop_circles(hit, hands)
+
+    def pop_circles(self, hit, hands=None):
+        circles = self.circles
+        if len(hit) == 0:
+            return
+        points = np.where(circles.state[hit] == STATE_GOOD, self.points_good, self.points_bad)
+        self.score += int(points.sum())
+        if hands is not None:
+            for hand, delta in zip(hands.tolist(), points.tolist()):
+                self.hand_scores[hand] = self.hand_scores.get(hand, 0) + delta
+        circles.kill(hit)
+
+        # Add new circles
+        add_remove_range = 3
+        self.create_circles(int(self.rng.integers(1, add_remove_range + 1, size=len(hit)).sum()))
+
+        # If collision happened randomly drop circles
+        alive = circles.alive_indices()
+        if len(alive) > 1:
+            rand_drop = self.rng.integers(0, len(alive) - 1, size=self.rng.integers(1, add_remove_range + 1))
+            circles.kill(alive[np.unique(rand_drop)])
+
+    def check_circles_count(self):
+        count = len(self.circles)
+        if count < self.min_circles:
+            self.create_circles(self.min_circles - count)
+        elif count > self.max_circles:
+            self.circles.kill(self.circles.alive_indices()[self.max_circles:])
+
+    def check_good_count(self):
+        if self.circles.good_count() == 0:
+            self.create_circles(6)
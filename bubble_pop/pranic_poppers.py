@@ -1,44 +1,57 @@
-import cv2
 import pygame
 import numpy as np
 import Hand as htm  # Your custom Hand tracking module
-import random as rand
-import math
+from hand_worker import AsyncHandDetector
+from hand_tracking import TrackingHandDetector
+from capture import CameraStream, SyntheticCapture
+from capture_config import open_capture, calibrated_mode, candidate_modes
+from poppers_model import Model, CAMERA_WIDTH, CAMERA_HEIGHT, ACTIVATION_RADIUS
+from text_cache import TextCache
+from preview import CameraPreview
+from assets import AssetManager
+from landmark_trace import TraceWriter, TraceDetector
+from profiler import FrameProfiler
+from camera_discovery import get_camera_index
+from landmark_filter import OneEuroFilter
+from gestures import GestureEngine, GESTURE_EVENT
+from hand_ids import HandIdentities
+from quality_governor import QualityGovernor
+import os
 import time
 
-import os
-from subprocess import PIPE, run
-
-def get_camera_index():
-    usb_needle = "USB Camera"
-    buildin_needle = "FaceTime HD Camera (Built-in)"
-    command = ['ffmpeg','-f', 'avfoundation','-list_devices','true','-i','""']
-    result = run(command, stdout=PIPE, stderr=PIPE, universal_newlines=True)
-    usb_id = None
-    builtin_id = None
-    for item in result.stderr.splitlines():
-        # print(item)
-        if usb_needle in item:
-            usb_id = int(item.split("[")[2].split(']')[0])
-        if buildin_needle in item:
-            builtin_id = int(item.split("[")[2].split(']')[0])
-
-    if usb_id is not None:
-        return usb_id
-    return builtin_id
-
-# Initialize Pygame
-pygame.init()
-
-# Constants
-CAMERA_WIDTH, CAMERA_HEIGHT = 640, 480
-
-ACTIVATION_RADIUS = 50  # Radius for finger activation
-GAME_DURATION = 60      # Game lasts for 20 seconds
-
-# Fonts
-FONT = pygame.font.SysFont('Pacifico', 70)
-LARGE_FONT = pygame.font.SysFont('Pacifico', 200)
+# Constants (the game rules' own live in poppers_model)
+SCALE_SPRITES_WITH_SCREEN = False  # Scale sprites with the screen instead of a fixed 2*ACTIVATION_RADIUS px
+TEXT_CACHE_SIZE = 64    # Rendered text surfaces kept around
+SIM_HZ = 30             # Simulation steps per second
+SIM_DT = 1.0 / SIM_HZ
+MAX_SIM_STEPS = 5       # Most steps taken in one frame when catching up after a slow frame
+RENDER_FPS = 60         # Render cap, 0 for uncapped
+PREVIEW_SIZE = (250, 150)  # Camera thumbnail size in pixels
+PREVIEW_FPS = 15        # Thumbnail refreshes per second, 0 for every camera frame
+RECORD_TRACE = None     # Path to record detected landmarks to, see landmark_trace.py
+REPLAY_TRACE = None     # Path of a recorded trace to play instead of running MediaPipe
+PROFILE_EXPORT_DIR = None  # Directory to write frame timing CSV/JSON to at every game over
+DIRTY_RENDERING = False # Only redraw and push the regions that changed during play
+ASYNC_INFERENCE = False # Run MediaPipe in a worker process instead of the render thread
+TRACK_HANDS = False     # Run MediaPipe on a box around the last known hands instead of the full frame
+DETECT_EVERY = 1        # With TRACK_HANDS, run MediaPipe every N frames and follow the hands by optical flow between
+MULTI_HAND = False      # Let every detected hand pop circles, not just the first one
+MAX_HANDS = 3
+FINGERTIPS = (8,)       # Landmark ids that act as poppers (4 thumb, 8 index, 12 middle, 16 ring, 20 pinky)
+SWEPT_COLLISIONS = False  # Test the fingertip's whole path since the last step, not just where it is now
+FILTER_LANDMARKS = False  # Smooth landmarks and predict them forward by the capture-to-screen latency
+GESTURE_CONTROLS = False  # Make a fist to pause and resume the game
+TARGET_FPS = None       # Lower quality in steps to hold this frame rate, None to never adapt
+QUALITY_LOG = None      # File the quality governor appends its decisions to
+CAPTURE_MODE = dict(fourcc="MJPG", width=CAMERA_WIDTH, height=CAMERA_HEIGHT, fps=30, buffersize=1)
+CALIBRATE_CAPTURE = False  # Measure the camera's modes once and use the one delivering the freshest frames
+FLUSH_STALE_FRAMES = False  # Drain frames queued in the driver so the game always gets the newest one
+MEASURE_FRAME_AGE = False  # Stamp frames with the driver's capture time and track their age
+
+# Fonts, loaded by init_pygame()
+FONT = None
+LARGE_FONT = None
+PROFILER_FONT = None
 
 # Colors
 WHITE = (255, 255, 255)
@@ -49,136 +62,51 @@ LIGHT_BLUE = (102, 178, 255)
 ORANGE = (255, 165, 0)
 
 
-# MVC Components
-class Model:
-    def __init__(self):
-        self.reset_game()
-
-    def reset_game(self):
-        self.max_circles = 40
-        self.min_circles = 10
-        self.circle_speed_max = 3
-        self.circle_speed_sel_max = 45
-        self.score = 50
-        self.prob_good = .51
-        self.good_foods = ['apple', 'lemon', 'carrot', 'sprouts', 'watermelon', 'banana']
-        self.bad_foods = ['fries', 'hamburger', 'onion', 'pizza', 'garlic', 'chicken']
-        self.circles = self.create_circles(10)  # Start with 5 to 9 circles
-
-    def create_circles(self, num_circles):
-        circles = []
-        for _ in range(num_circles):
-            state = 'bad'
-            if rand.random() < self.prob_good:
-                state = 'good'
-            icon = ""
-            if state == 'good':
-                icon = self.good_foods[rand.randint(0, len(self.good_foods)-1)]
-            else:
-                icon = self.bad_foods[rand.randint(0, len(self.bad_foods)-1)]
-            speed_range = np.concatenate((np.arange(-self.circle_speed_max, 0), np.arange(1, self.circle_speed_max+1))).tolist()
-            circle = {
-                'position': (
-                    rand.randint(0, CAMERA_WIDTH),
-                    rand.randint(0, CAMERA_HEIGHT)
-                ),
-                'speed': (
-                    rand.choice(speed_range),
-                    rand.choice(speed_range)
-                ),
-                'state': state,
-                'icon': icon
-            }
-            circles.append(circle)
-        return circles
-
-    def update_circles(self):
-        for circle in self.circles:
-            x, y = circle['position']
-            sx, sy = circle['speed']
-
-            x += sx
-            y += sy
-
-            # Bounce off the edges
-            if x < 0 or x > CAMERA_WIDTH:
-                sx = -sx
-                x = max(0, min(x, CAMERA_WIDTH))
-            if y < 0 or y > CAMERA_HEIGHT:
-                sy = -sy
-                y = max(0, min(y, CAMERA_HEIGHT))
-
-            circle['position'] = (x, y)
-            circle['speed'] = (sx, sy)
-
-    def check_collisions(self, finger_pos):
-        circles_to_remove = []
-        # With some probability, randomly drop a random circle each collision
-        for i, circle in enumerate(self.circles):
-            dist = math.hypot(
-                circle['position'][0] - finger_pos[0],
-                circle['position'][1] - finger_pos[1]
-            )
-            if dist < ACTIVATION_RADIUS:
-                circles_to_remove.append(i)
-                self.score += 3 if circle['state'] == 'good' else -20
-        add_remove_range = 3
-        for index in reversed(circles_to_remove):
-            self.circles.pop(index)
-            # Add new circles
-            new_circles = self.create_circles(rand.randint(1, add_remove_range))
-            self.circles.extend(new_circles)
-        
-        # If collision happened randomly drop circles
-        if circles_to_remove:
-            rand_drop_idxs = np.unique(np.random.randint(0, len(self.circles)-1, size=rand.randint(1, add_remove_range))).tolist()
-            rand_drop_idxs.sort(reverse=True)
-            for rand_drop_idx in rand_drop_idxs:
-                self.circles.pop(rand_drop_idx)
-    
-    def check_circles_count(self):
-        if len(self.circles) < self.min_circles:
-            new_circles = self.create_circles(self.min_circles - len(self.circles))
-            self.circles.extend(new_circles)
-        elif len(self.circles) > self.max_circles:
-            self.circles = self.circles[:self.max_circles]
-    
-    def check_good_count(self):
-        good_count = sum(1 for circle in self.circles if circle['state'] == 'good')
+def init_pygame():
+    """Start pygame and load the fonts
+
+    Not done at import: inference workers are spawned, which re-imports the main
+    script in every worker, and they have no use for a pygame of their own.
+    """
+    global FONT, LARGE_FONT, PROFILER_FONT
+    pygame.init()
+    if FONT is None:
+        FONT = pygame.font.SysFont('Pacifico', 70)
+        LARGE_FONT = pygame.font.SysFont('Pacifico', 200)
+        PROFILER_FONT = pygame.font.SysFont('monospace', 20)
 
-        if good_count == 0:
-            new_circles = self.create_circles(6)
-            self.circles.extend(new_circles)
 
+# MVC Components
 class View:
     def __init__(self, screen, model):
+        init_pygame()
         self.screen = screen
         self.model = model
-        self.screen_width, self.screen_height = pygame.display.get_surface().get_size()  # Get full screen size
+        self.screen_width, self.screen_height = self.screen.get_size()  # Full screen, or this station's viewport
         # Scaling factor
         self.scale_x = self.screen_width / CAMERA_WIDTH
         self.scale_y = self.screen_height / CAMERA_HEIGHT
 
-        self.point_image = pygame.image.load('./bubble_pop/assets/hand_black.png')
-        self.point_image = pygame.transform.scale(self.point_image, (2*ACTIVATION_RADIUS, 2*ACTIVATION_RADIUS))
+        # Sprites keep their fixed pixel size unless they are set to follow the screen
+        self.sprite_scale = min(self.scale_x, self.scale_y) if SCALE_SPRITES_WITH_SCREEN else 1.0
+        sprite_size = (round(2*ACTIVATION_RADIUS*self.sprite_scale),) * 2
 
-        self.background_img = pygame.image.load('./bubble_pop/assets/grass_sky.jpg')
-        self.background_img = pygame.transform.scale(self.background_img, self.screen.get_size())
+        self.assets = AssetManager()
+        self.point_image = self.assets.scaled('hand_black.png', sprite_size)
+        self.background_img = self.assets.scaled('grass_sky.jpg', self.screen.get_size(), alpha=False)
 
-        self.title_img = pygame.image.load('./bubble_pop/assets/title_orange_2.png')
-        self.game_over_img = pygame.image.load('./bubble_pop/assets/game_over_orange.png')
+        self.title_img = self.assets.load('title_orange_2.png')
+        self.game_over_img = self.assets.load('game_over_orange.png')
 
-        self.bad_food_imgs = dict()
-        self.good_food_imgs = dict()
-        for bad_asset_name in self.model.bad_foods:
-            bad_food_img = pygame.image.load(f'./bubble_pop/assets/{bad_asset_name}.png')
-            bad_food_img = pygame.transform.scale(bad_food_img, (2*ACTIVATION_RADIUS, 2*ACTIVATION_RADIUS))
-            self.bad_food_imgs[bad_asset_name] = (bad_food_img, bad_food_img.get_rect())
-        for good_asset_name in self.model.good_foods:
-            good_food_img = pygame.image.load(f'./bubble_pop/assets/{good_asset_name}.png')
-            good_food_img = pygame.transform.scale(good_food_img, (2*ACTIVATION_RADIUS, 2*ACTIVATION_RADIUS))
-            self.good_food_imgs[good_asset_name] = (good_food_img, good_food_img.get_rect())
+        # One image per icon id, in the same order as model.icons, packed in one atlas
+        self.icon_imgs = self.assets.atlas([f'{asset_name}.png' for asset_name in self.model.icons], sprite_size)
 
+        self.text_cache = TextCache(TEXT_CACHE_SIZE)
+        self.hud_text = None
+        self.hud_surface = None
+        # Text on the static screens never changes, so render it once up front
+        self.restart_surface = self.render_text("Press R to Restart or S for Splash Screen")
+        self.start_surface = self.render_text("Press SPACE to start the game")
     
     def scale_point(self, point):
         return (int(point[0] * self.scale_x), int(point[1] * self.scale_y))
@@ -190,16 +118,23 @@ class View:
         # self.screen.fill((0, 0, 0))
         self.screen.blit(self.background_img, (0, 0))
 
-    def draw_circles(self, circles):
-        for circle in circles:
-            if circle['state'] == 'good':
-                good_food_img, good_food_rect = self.good_food_imgs[circle['icon']]
-                good_food_rect.x, good_food_rect.y = self.scale_point(circle['position'])
-                self.screen.blit(good_food_img, good_food_rect)
-            elif circle['state'] == 'bad':
-                bad_food_img, bad_food_rect = self.bad_food_imgs[circle['icon']]
-                bad_food_rect.x, bad_food_rect.y = self.scale_point(circle['position'])
-                self.screen.blit(bad_food_img, bad_food_rect)
+    def circle_blits(self, circles, alpha):
+        """(image, screen position) for every alive circle"""
+        alive = circles.alive_indices()
+        # Interpolate between the previous and current simulation step
+        position = circles.previous[alive] + (circles.position[alive] - circles.previous[alive]) * alpha
+        points = (position * (self.scale_x, self.scale_y)).astype(np.int32).tolist()
+        icon_imgs = self.icon_imgs
+        return [(icon_imgs[icon], point) for icon, point in zip(circles.icon[alive].tolist(), points)]
+
+    def draw_circles(self, circles, alpha=1.0):
+        self.screen.blits(self.circle_blits(circles, alpha), doreturn=False)
+
+    def preview_position(self, size):
+        return (self.screen_width - size[0] - 10, self.screen_height - size[1] - 10)
+
+    def draw_preview(self, preview_surface, updated=True):
+        self.screen.blit(preview_surface, self.preview_position(preview_surface.get_size()))
 
     def draw_halo(self, finger_pos):
         self.screen.blit(self.point_image, self.scale_point(finger_pos))
@@ -211,11 +146,31 @@ class View:
         #     2
         # )
 
-    def draw_text(self, score, time_left):
-        score_text = FONT.render(f"Score: {score}", True, ORANGE)
-        time_text = FONT.render(f"Time left: {int(time_left)}", True, ORANGE)
-        self.screen.blit(score_text, (10, 10))
-        self.screen.blit(time_text, (10, 80))
+    def hud_lines(self, score, time_left, hand_scores=None):
+        lines = [f"Score: {score}", f"Time left: {int(time_left)}"]
+        if hand_scores:
+            lines.append("   ".join(f"P{hand + 1}: {points}" for hand, points in sorted(hand_scores.items())))
+        return lines
+
+    def render_text(self, text, font=None, color=ORANGE):
+        return self.text_cache.render(font or FONT, text, color)
+
+    def update_hud(self, score, time_left, hand_scores=None):
+        """Composite the HUD lines into one surface; only re-rendered when a line changes"""
+        lines = self.hud_lines(score, time_left, hand_scores)
+        if lines == self.hud_text:
+            return False
+        self.hud_text = lines
+        surfaces = [self.render_text(line) for line in lines]
+        width = max(surface.get_width() for surface in surfaces)
+        self.hud_surface = pygame.Surface((width, 70 * (len(lines) - 1) + surfaces[-1].get_height()), pygame.SRCALPHA)
+        for i, surface in enumerate(surfaces):
+            self.hud_surface.blit(surface, (0, 70 * i))
+        return True
+
+    def draw_text(self, score, time_left, hand_scores=None):
+        self.update_hud(score, time_left, hand_scores)
+        self.screen.blit(self.hud_surface, (10, 10))
 
     def draw_game_over(self, score):
         # text_surface = LARGE_FONT.render("Game Over", True, (255, 0, 0))
@@ -223,17 +178,15 @@ class View:
         game_over_rect = self.game_over_img.get_rect(center=(self.screen_width // 2, self.screen_height // 2 - 200))
         self.screen.blit(self.game_over_img, game_over_rect)
 
-        score_surface = FONT.render(f"Your Score: {score}", True, ORANGE)
         if score > 0:
-            score_surface = FONT.render(f"Congratulations You Survived!!!! Your Score: {score}", True, ORANGE)
+            score_surface = self.render_text(f"Congratulations You Survived!!!! Your Score: {score}")
         else:
-            score_surface = FONT.render(f"Sorry You LOSE!!!! Your Score: {score}", True, ORANGE)
+            score_surface = self.render_text(f"Sorry You LOSE!!!! Your Score: {score}")
         score_rect = score_surface.get_rect(center=(self.screen_width // 2, self.screen_height // 2 - 100))
         self.screen.blit(score_surface, score_rect)
 
-        restart_surface = FONT.render("Press R to Restart or S for Splash Screen", True, ORANGE)
-        restart_rect = restart_surface.get_rect(center=(self.screen_width // 2, self.screen_height // 2 - 20))
-        self.screen.blit(restart_surface, restart_rect)
+        restart_rect = self.restart_surface.get_rect(center=(self.screen_width // 2, self.screen_height // 2 - 20))
+        self.screen.blit(self.restart_surface, restart_rect)
     
     def draw_splash(self):
         # text_surface = LARGE_FONT.render("Panic Poppers", True, ORANGE)
@@ -241,131 +194,456 @@ class View:
         title_rect = self.title_img.get_rect(center=(self.screen_width // 2, self.screen_height // 2 - 200))
         self.screen.blit(self.title_img, title_rect)
 
-        restart_surface = FONT.render("Press SPACE to start the game", True, ORANGE)
-        restart_rect = restart_surface.get_rect(center=(self.screen_width // 2, self.screen_height // 2 - 50))
-        self.screen.blit(restart_surface, restart_rect)
+        start_rect = self.start_surface.get_rect(center=(self.screen_width // 2, self.screen_height // 2 - 50))
+        self.screen.blit(self.start_surface, start_rect)
+
+    def draw_overlay(self, overlay_surface, updated=True):
+        if overlay_surface is not None:
+            self.screen.blit(overlay_surface, (self.screen_width - overlay_surface.get_width() - 10, 10))
+
+    def present(self):
+        pygame.display.flip()
+
+
+class DirtySprite(pygame.sprite.DirtySprite):
+    def __init__(self, layer):
+        super().__init__()
+        self._layer = layer
+        self.image = pygame.Surface((1, 1), pygame.SRCALPHA)
+        self.rect = self.image.get_rect()
+        self.visible = 0
+
+    def show(self, image, topleft):
+        if image is not self.image or self.rect.topleft != topleft or not self.visible:
+            self.image = image
+            self.rect = image.get_rect(topleft=topleft)
+            self.visible = 1
+            self.dirty = 1
+
+    def hide(self):
+        if self.visible:
+            self.visible = 0
+
+
+class DirtyView(View):
+    """View that only redraws and pushes the screen regions that changed during play
+
+    Circles, halos, HUD lines and the camera preview are sprites in a LayeredDirty
+    group over the background; the splash and game over screens are drawn in full.
+    """
+
+    PREVIEW_LAYER, HALO_LAYER, CIRCLE_LAYER, HUD_LAYER, OVERLAY_LAYER = range(5)
+
+    def __init__(self, screen, model):
+        super().__init__(screen, model)
+        self.sprites = pygame.sprite.LayeredDirty()
+        self.sprites.clear(self.screen, self.background_img)
+        self.preview_sprite = self.add_sprite(self.PREVIEW_LAYER)
+        self.circle_sprites = []
+        self.halo_sprites = []
+        self.hud_sprite = self.add_sprite(self.HUD_LAYER)
+        self.overlay_sprite = self.add_sprite(self.OVERLAY_LAYER)
+        self.halo_count = 0
+        self.static_frame = False
+        self.needs_repaint = True
+
+    def add_sprite(self, layer, pool=None):
+        sprite = DirtySprite(layer)
+        self.sprites.add(sprite)
+        if pool is not None:
+            pool.append(sprite)
+        return sprite
+
+    def draw_background(self):
+        # The sprite group restores the background under anything that moved
+        self.halo_count = 0
+        self.static_frame = False
+
+    def draw_circles(self, circles, alpha=1.0):
+        blits = self.circle_blits(circles, alpha)
+        while len(self.circle_sprites) < len(blits):
+            self.add_sprite(self.CIRCLE_LAYER, self.circle_sprites)
+        for sprite, (image, point) in zip(self.circle_sprites, blits):
+            sprite.show(image, tuple(point))
+        for sprite in self.circle_sprites[len(blits):]:
+            sprite.hide()
+
+    def draw_halo(self, finger_pos):
+        if self.halo_count == len(self.halo_sprites):
+            self.add_sprite(self.HALO_LAYER, self.halo_sprites)
+        self.halo_sprites[self.halo_count].show(self.point_image, self.scale_point(finger_pos))
+        self.halo_count += 1
+
+    def draw_preview(self, preview_surface, updated=True):
+        self.preview_sprite.show(preview_surface, self.preview_position(preview_surface.get_size()))
+        if updated:
+            self.preview_sprite.dirty = 1
+
+    def draw_text(self, score, time_left, hand_scores=None):
+        if self.update_hud(score, time_left, hand_scores):
+            self.hud_sprite.show(self.hud_surface, (10, 10))
+
+    def draw_overlay(self, overlay_surface, updated=True):
+        if overlay_surface is None:
+            self.overlay_sprite.hide()
+        elif self.static_frame:
+            View.draw_overlay(self, overlay_surface)
+        else:
+            self.overlay_sprite.show(overlay_surface, (self.screen_width - overlay_surface.get_width() - 10, 10))
+            if updated:
+                self.overlay_sprite.dirty = 1
+
+    def draw_full_screen(self, draw):
+        # Static screens bypass the sprites and are pushed whole
+        View.draw_background(self)
+        draw()
+        self.static_frame = True
+
+    def draw_game_over(self, score):
+        self.draw_full_screen(lambda: View.draw_game_over(self, score))
+
+    def draw_splash(self):
+        self.draw_full_screen(lambda: View.draw_splash(self))
+
+    def present(self):
+        if self.static_frame:
+            pygame.display.flip()
+            self.needs_repaint = True
+            return
+        for sprite in self.halo_sprites[self.halo_count:]:
+            sprite.hide()
+        if self.needs_repaint:
+            # Coming back from a static screen, so the whole screen is stale
+            self.sprites.repaint_rect(self.screen.get_rect())
+            self.needs_repaint = False
+        pygame.display.update(self.sprites.draw(self.screen))
+
+def named_path(path, name):
+    """path with _name added before its extension, or path itself when name is None"""
+    if name is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{name}{ext}"
+
 
 class Controller:
-    def __init__(self, screen):
-        self.start_time = time.time()
-        self.model = Model()
-        self.view = View(screen, self.model)
-        self.detector = htm.HandDetector(detectionCon=0.7)
-        # Call the function to find the external camera
-        external_camera_index = get_camera_index()
-        self.cap = cv2.VideoCapture(external_camera_index)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
+    def __init__(self, screen, cap=None, detector=None, model=None, view=None, name=None):
+        """cap, detector, model and view default to the camera, MediaPipe, a new Model and
+        a full screen View; pass stand-ins to run the game from recordings or synthetic input.
+        name tells several controllers in one process apart: it goes into the names of the
+        trace, profile and quality log files each one writes, so they never share a file."""
+        self.name = name
+        self.model = model if model is not None else Model()
+        if view is not None:
+            self.view = view
+        else:
+            self.view = DirtyView(screen, self.model) if DIRTY_RENDERING else View(screen, self.model)
+        max_hands = MAX_HANDS if MULTI_HAND else 2
+        if detector is not None:
+            self.detector = detector
+        elif REPLAY_TRACE:
+            self.detector = TraceDetector.from_file(REPLAY_TRACE)
+        elif ASYNC_INFERENCE:
+            self.detector = AsyncHandDetector(maxHands=max_hands, detectionCon=0.7)
+        elif TRACK_HANDS:
+            self.detector = TrackingHandDetector(maxHands=max_hands, detectionCon=0.7, detectEvery=DETECT_EVERY)
+        else:
+            self.detector = htm.HandDetector(maxHands=max_hands, detectionCon=0.7)
+        self.async_inference = isinstance(self.detector, AsyncHandDetector)
+        if cap is None and REPLAY_TRACE and detector is None:
+            # A replay needs frames to pace the loop, not the camera
+            cap = SyntheticCapture()
+        elif cap is None:
+            # Call the function to find the external camera
+            external_camera_index = get_camera_index()
+            cap = self.open_camera(external_camera_index)
+        self.cap = cap
+        self.trace_writer = TraceWriter(named_path(RECORD_TRACE, name), max_hands) if RECORD_TRACE else None
+        # Capture runs on its own thread so the render loop never blocks on the camera
+        self.stream = CameraStream(self.cap, FLUSH_STALE_FRAMES, MEASURE_FRAME_AGE).start()
+        self.pointers = np.zeros((0, 2))
+        self.pointer_hands = np.zeros(0, dtype=np.int64)
+        self.pointer_keys = []      # (hand id, fingertip) of each pointer
+        self.hand_ids = HandIdentities()
+        self.landmark_ids = np.zeros(0, dtype=np.int64)  # Stable id of each hand the filter is fed
+        self.prev_pointers = {}     # Pointer key -> position at the previous simulation step, for swept collisions
+        self.landmark_filter = OneEuroFilter() if FILTER_LANDMARKS else None
+        self.landmark_time = 0.0
+        self.result_seq = 0         # Newest detection result already used
+        self.gestures = GestureEngine(max_hands) if GESTURE_CONTROLS else None
+        self.paused = False
+        self.preview = CameraPreview(PREVIEW_SIZE, PREVIEW_FPS)
+        self.accumulator = 0.0
+        self.clock = pygame.time.Clock()
+        self.profiler = FrameProfiler(["capture", "detect", "preview", "model", "draw", "flip"])
+        self.show_profiler = False
+        self.overlay_every = 1      # Frames between halo and HUD updates
+        self.frame_count = 0
+        self.halo_pointers = []
+        self.hud_values = None
+        quality_log = named_path(QUALITY_LOG, name) if QUALITY_LOG else None
+        self.governor = QualityGovernor(TARGET_FPS, log_path=quality_log) if TARGET_FPS else None
+        if self.governor is not None:
+            self.governor.apply(self)
         self.running = True
         self.game_state = "SPLASH"
 
-    def process_events(self):
-        for event in pygame.event.get():
+    @staticmethod
+    def open_camera(source):
+        """Open source at CAMERA_WIDTH x CAMERA_HEIGHT, which all pointer and circle maths assume
+
+        A calibrated mode the driver delivers at another size falls back to CAPTURE_MODE;
+        if even that comes out at the wrong size the camera is refused.
+        """
+        modes = [CAPTURE_MODE]
+        if CALIBRATE_CAPTURE:
+            modes.insert(0, calibrated_mode(source, candidate_modes([(CAMERA_WIDTH, CAMERA_HEIGHT)])))
+        for mode in modes:
+            cap, accepted, mismatches = open_capture(source, mode)
+            if accepted is None or (accepted["width"], accepted["height"]) == (CAMERA_WIDTH, CAMERA_HEIGHT):
+                return cap
+            cap.release()
+        raise RuntimeError(f"Camera {source} delivers {accepted['width']}x{accepted['height']}, "
+                           f"the game needs {CAMERA_WIDTH}x{CAMERA_HEIGHT}")
+
+    def process_events(self, events=None):
+        for event in pygame.event.get() if events is None else events:
             if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
                 self.running = False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                self.show_profiler = not self.show_profiler
+            if (event.type == GESTURE_EVENT and event.engine is self.gestures
+                    and event.gesture == "fist" and event.started):
+                if self.game_state == "GAME":
+                    self.paused = not self.paused
             if self.game_state == "OVER":
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_r:
-                        self.game_state = "GAME"
-                        self.model.reset_game()
-                        self.start_time = time.time()
+                        self.start_game()
                     if event.key == pygame.K_s:
                         self.game_state = "SPLASH"
             if self.game_state == "SPLASH":
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_SPACE:
-                        self.game_state = "GAME"
-                        self.model.reset_game()
-                        self.start_time = time.time()
+                        self.start_game()
     
     def update_game_state(self):
-        elapsed_time = time.time() - self.start_time
-        if elapsed_time >= GAME_DURATION or self.model.score <= 0:
+        if self.model.game_over:
             self.game_state = "OVER"
-    
-    def update_circle_speed(self, game_time):
-        increase_every_secs = 4
-        speed_scaler = 2
-        new_speed = 2 + int((game_time//increase_every_secs)*speed_scaler)
-        if new_speed <= self.model.circle_speed_sel_max:
-            self.model.circle_speed_max = new_speed
-        # print(f"game_time: {game_time}, circle_speed_max: {self.model.circle_speed_max}")
-
-    def update(self):
+            if PROFILE_EXPORT_DIR:
+                self.profiler.export(PROFILE_EXPORT_DIR, named_path("frame_profile", self.name))
+
+    def identified_hands(self, img):
+        """Detected landmarks ordered by stable hand id, and the ids
+
+        The detector lists hands in no fixed order, so scores are credited to ids
+        matched from frame to frame and the filter always sees a hand in the same row.
+        """
+        landmarks, handedness, scores = self.detector.findAllPositions(img)
+        ids = self.hand_ids.assign(landmarks[:, 0, :2], handedness, time.perf_counter())
+        order = np.argsort(ids)
+        return landmarks[order], ids[order]
+
+    def find_pointers(self, img):
+        """Pointers from the newest landmarks"""
+        landmarks, ids = self.identified_hands(img)
+        self.set_pointers(landmarks, ids)
+
+    def set_pointers(self, landmarks, ids):
+        """Collect the FINGERTIPS of every hand, mirrored to match the flipped display
+
+        Without MULTI_HAND only the index fingertip of the lowest id hand, the one in
+        view longest, is used, so a second hand coming and going never takes over.
+        """
+        tips = FINGERTIPS if MULTI_HAND else (8,)
+        if not MULTI_HAND:
+            landmarks, ids = landmarks[:1], ids[:1]
+        pointers = landmarks[:, tips, :2].reshape(-1, 2).astype(np.float64)
+        pointers[:, 0] = CAMERA_WIDTH - pointers[:, 0]
+        self.pointers = pointers
+        self.pointer_hands = np.repeat(ids, len(tips))
+        self.pointer_keys = [(int(id), tip) for id in ids for tip in tips]
+
+    def detection_result(self, frame_seq, frame_time):
+        """(seq, capture time) of the frame the detector's landmarks came from, or
+        (seq, None) when they are not new since the last call"""
+        if not self.async_inference:
+            return frame_seq, frame_time
+        seq = self.detector.result_seq
+        if seq <= self.result_seq:
+            return seq, None
+        self.result_seq = seq
+        return seq, self.stream.timestamp_of(seq)
+
+    def filter_landmarks(self, img, frame_time):
+        """Feed the newest landmarks, stamped with their capture time, to the filter"""
+        landmarks, self.landmark_ids = self.identified_hands(img)
+        if not MULTI_HAND:
+            landmarks, self.landmark_ids = landmarks[:1], self.landmark_ids[:1]
+        self.landmark_filter(landmarks[..., :2], frame_time, self.landmark_ids.tolist())
+        self.landmark_time = frame_time
+
+    def predict_pointers(self):
+        """Pointers from the filtered landmarks, extrapolated to the present moment"""
+        predicted = self.landmark_filter.predict(time.perf_counter() - self.landmark_time)
+        if predicted is None:
+            return
+        self.set_pointers(predicted, self.landmark_ids[:len(predicted)])
+
+    def current_pointers(self):
+        return self.pointers
+
+    def step_simulation(self):
+        """Advance the model by one fixed SIM_DT step"""
+        pointers = np.array(self.current_pointers(), dtype=np.float64).reshape(-1, 2)
+        prev_pointers = None
+        if SWEPT_COLLISIONS:
+            # Sweep each fingertip from where the same fingertip of the same hand was; one
+            # that just appeared has no path and only hits what moves through it
+            prev_pointers = np.array([self.prev_pointers.get(key, pointer)
+                                      for key, pointer in zip(self.pointer_keys, pointers)]).reshape(-1, 2)
+        self.model.step(SIM_DT, pointers, self.pointer_hands if MULTI_HAND else None, prev_pointers)
+        self.prev_pointers = dict(zip(self.pointer_keys, pointers))
+
+    def start_game(self):
+        self.game_state = "GAME"
+        self.model.reset_game()
+        self.accumulator = 0.0
+        self.prev_pointers = {}
+        self.hand_ids.reset()       # Players start again from P1
+        self.paused = False
+        self.hud_values = None
+        if self.governor is not None:
+            # reset_game restores the model's defaults; put the current quality level back
+            self.governor.apply(self)
+
+    def update(self, frame_dt=SIM_DT):
+        profiler = self.profiler
+        profiler.begin_frame()
         self.view.draw_background()
+        profiler.mark("draw")
 
         if self.game_state == "GAME":
-            # Capture frame
-            success, img = self.cap.read()
-            if not success:
+            # Grab the newest captured frame, if any, without blocking
+            if self.stream.failed:
                 print("Failed to grab frame")
                 self.running = False
                 return
+            latest = self.stream.read_latest()
+            profiler.mark("capture")
 
             # Update game state
             self.update_game_state()
 
-            # Hand detection
-            self.detector.findHands(img, draw=False)
-            lmList = self.detector.findPosition(img, draw=False)
-            
-             # Convert image for Pygame
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            img = np.rot90(img)
-            camera_frame_surface = pygame.surfarray.make_surface(img)
-            camera_view_shape = (250,150)
-            camera_frame_surface = pygame.transform.scale(camera_frame_surface, camera_view_shape)
-            self.view.screen.blit(camera_frame_surface, (self.view.screen_width - camera_view_shape[0] - 10, self.view.screen_height - camera_view_shape[1] - 10))
+            preview_updated = False
+            if latest is not None:
+                img, frame_seq, frame_time = latest
+
+                # Hand detection
+                if self.async_inference:
+                    self.detector.findHands(img, draw=False, seq=frame_seq)
+                else:
+                    self.detector.findHands(img, draw=False)
+                # Landmarks belong to the frame they were detected on, which with async
+                # inference is older than this one; only new results count as samples
+                result_seq, result_time = self.detection_result(frame_seq, frame_time)
+                if self.landmark_filter is not None:
+                    if result_time is not None:
+                        self.filter_landmarks(img, result_time)
+                else:
+                    self.find_pointers(img)
+                if result_time is not None and self.gestures is not None:
+                    self.gestures.process(self.detector.findAllPositions(img)[0], result_time)
+                if result_time is not None and self.trace_writer is not None:
+                    self.trace_writer.write(result_time, *self.detector.findAllPositions(normalized=True), seq=result_seq)
+                profiler.mark("detect")
+
+                # Refresh the camera thumbnail
+                preview_updated = self.preview.update(img)
+            # Without a new frame keep animating with the last detection and preview
+            if self.preview.ready:
+                self.view.draw_preview(self.preview.surface, preview_updated)
+            profiler.mark("preview")
 
             # # Draw Camera Frame
             # self.view.draw_frame(camera_frame_surface)
 
-            if lmList:
-                index_finger_tip = lmList[8][1], lmList[8][2]
-                # Adjust x-coordinate due to flipping
-                index_finger_tip = (CAMERA_WIDTH - index_finger_tip[0], index_finger_tip[1])
-                # Draw halo around finger tip
-                self.view.draw_halo(index_finger_tip)
-                # Check for collisions
-                self.model.check_collisions(index_finger_tip)
-            
-            self.model.check_circles_count()
-            self.model.check_good_count()
-
-            # Update and draw circles
-            self.model.update_circles()
-            self.view.draw_circles(self.model.circles)
-
-            game_time = (time.time() - self.start_time)
-            time_left = GAME_DURATION - game_time
-            self.update_circle_speed(game_time)
-            # if game_time%5 == 0:
-            #     self.model.score -= 5
+            # Line the pointers up with where the fingers are now, not when they were captured
+            if self.landmark_filter is not None:
+                self.predict_pointers()
+
+            # Advance the simulation in fixed steps for however much real time has passed
+            if not self.paused:
+                self.accumulator += frame_dt
+            steps = 0
+            while self.accumulator >= SIM_DT and steps < MAX_SIM_STEPS:
+                self.step_simulation()
+                self.accumulator -= SIM_DT
+                steps += 1
+            if steps == MAX_SIM_STEPS:
+                # Too far behind to catch up; drop the backlog rather than spiral
+                self.accumulator = 0.0
+            profiler.mark("model")
+
+            # Halos and HUD follow the game every overlay_every frames
+            if self.frame_count % self.overlay_every == 0 or self.hud_values is None:
+                self.halo_pointers = list(self.current_pointers())
+                self.hud_values = (self.model.score, self.model.time_left,
+                                   dict(self.model.hand_scores) if MULTI_HAND else None)
+            self.frame_count += 1
+
+            # Draw halo around finger tips
+            for pointer in self.halo_pointers:
+                self.view.draw_halo(pointer)
+
+            # Draw circles between the last two simulation states
+            self.view.draw_circles(self.model.circles, self.accumulator / SIM_DT)
 
             # Draw score and time            
-            self.view.draw_text(self.model.score, time_left)
+            self.view.draw_text(*self.hud_values)
         elif self.game_state == "OVER":
             # Draw game over screen
             self.view.draw_game_over(self.model.score)
         elif self.game_state == "SPLASH":
             self.view.draw_splash()
 
+        if self.show_profiler:
+            self.view.draw_overlay(*profiler.overlay_surface(PROFILER_FONT, WHITE))
+        else:
+            self.view.draw_overlay(None)
+        profiler.mark("draw")
+
         # Update display
-        # pygame.display.update()
-        pygame.display.flip()
+        self.view.present()
+        profiler.mark("flip")
+        profiler.end_frame()
+
+        if self.governor is not None and self.game_state == "GAME":
+            current = profiler.current / 1e6
+            # The detector times MediaPipe itself; for worker detectors the detect mark is only submit/poll
+            if self.governor.update(current[-1], self.detector.inferenceMs):
+                self.governor.apply(self)
 
 
     def run(self):
         while self.running:
+            # Cap the render rate; the simulation runs at SIM_HZ regardless
+            frame_dt = self.clock.tick(RENDER_FPS) / 1000.0
             self.process_events()
-            self.update()
+            self.update(frame_dt)
 
         # Clean up
+        self.stream.stop()
+        if self.async_inference:
+            self.detector.close()
+        if self.trace_writer is not None:
+            self.trace_writer.close()
         self.cap.release()
         pygame.quit()
 
 # Run the game
 if __name__ == "__main__":
+    init_pygame()
     # Initialize Pygame screen
     # screen = pygame.display.set_mode((CAMERA_WIDTH, CAMERA_HEIGHT))
     full_screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)  # Full-screen Pygame
@@ -0,0 +1,40 @@
+import time
+
+import cv2
+import numpy as np
+import pygame
+
+
+class CameraPreview:
+    """Picture-in-picture camera thumbnail drawn into one persistent surface
+
+    Frames are shrunk by OpenCV first, colour converted into a reused buffer and
+    copied straight into the surface, so a refresh allocates nothing. Refreshes are
+    limited to fps per second whatever the game's frame rate.
+    """
+
+    def __init__(self, size=(250, 150), fps=15):
+        self.size = size
+        self.fps = fps
+        w, h = size
+        self.small = np.empty((h, w, 3), dtype=np.uint8)
+        self.rgb = np.empty((h, w, 3), dtype=np.uint8)
+        # Mirrored and transposed to the (x, y) layout surfarray expects, like np.rot90 did
+        self.pixels = self.rgb[:, ::-1].swapaxes(0, 1)
+        self.surface = pygame.Surface(size)
+        self.last_update = None
+
+    @property
+    def ready(self):
+        return self.last_update is not None
+
+    def update(self, img, now=None):
+        """Refresh the thumbnail from a BGR frame if it is due; returns True if it was"""
+        now = time.perf_counter() if now is None else now
+        if self.last_update is not None and self.fps and now - self.last_update < 1.0 / self.fps:
+            return False
+        self.last_update = now
+        cv2.resize(img, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        pygame.surfarray.blit_array(self.surface, self.pixels)
+        return True
@@ -0,0 +1,111 @@
+import csv
+import json
+import os
+import time
+
+import numpy as np
+import pygame
+
+# Lower edges of the histogram bins in milliseconds, the last bin catches everything slower
+HISTOGRAM_EDGES_MS = np.array([0, 1, 2, 4, 8, 16, 33, 50, 100])
+
+
+class FrameProfiler:
+    """Per-stage frame timing kept in fixed ring buffers of perf_counter_ns deltas
+
+    Call begin_frame() at the top of a frame, mark(stage) after each stage (time since
+    the previous mark is added to that stage) and end_frame() once the frame is out.
+    """
+
+    def __init__(self, stages, frames=600):
+        self.stages = list(stages)
+        self.index = {stage: i for i, stage in enumerate(self.stages)}
+        self.frames = frames
+        self.samples = np.zeros((frames, len(self.stages) + 1), dtype=np.int64)  # Last column is the whole frame
+        self.current = np.zeros(len(self.stages) + 1, dtype=np.int64)
+        self.count = 0
+        self.frame_start = 0
+        self.last = 0
+        self.overlay = None
+        self.overlay_time = 0.0
+
+    def begin_frame(self):
+        self.current[:] = 0
+        self.frame_start = self.last = time.perf_counter_ns()
+
+    def mark(self, stage):
+        now = time.perf_counter_ns()
+        self.current[self.index[stage]] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        self.current[-1] = time.perf_counter_ns() - self.frame_start
+        self.samples[self.count % self.frames] = self.current
+        self.count += 1
+
+    def recent(self):
+        """Samples currently in the ring as milliseconds, oldest first"""
+        n = min(self.count, self.frames)
+        if self.count <= self.frames:
+            rows = self.samples[:n]
+        else:
+            rows = np.roll(self.samples, -(self.count % self.frames), axis=0)
+        return rows / 1e6
+
+    def columns(self):
+        return self.stages + ["frame"]
+
+    def summary(self):
+        """Mean, percentiles and histogram per stage over the ring"""
+        ms = self.recent()
+        result = {}
+        if len(ms) == 0:
+            return result
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99], axis=0)
+        for i, stage in enumerate(self.columns()):
+            bins = np.searchsorted(HISTOGRAM_EDGES_MS, ms[:, i], side="right") - 1
+            histogram = np.bincount(np.clip(bins, 0, None), minlength=len(HISTOGRAM_EDGES_MS))
+            result[stage] = {
+                "mean": float(ms[:, i].mean()),
+                "p50": float(p50[i]),
+                "p95": float(p95[i]),
+                "p99": float(p99[i]),
+                "max": float(ms[:, i].max()),
+                "histogram": histogram.tolist(),
+            }
+        return result
+
+    def overlay_surface(self, font, color, refresh=0.5):
+        """Table of the current numbers, re-rendered at most every refresh seconds"""
+        now = time.perf_counter()
+        if self.overlay is not None and now - self.overlay_time < refresh:
+            return self.overlay, False
+        self.overlay_time = now
+        summary = self.summary()
+        lines = [f"{'stage':<9}{'mean':>7}{'p95':>7}{'max':>7}  ms"]
+        for stage, stats in summary.items():
+            lines.append(f"{stage:<9}{stats['mean']:>7.2f}{stats['p95']:>7.2f}{stats['max']:>7.2f}")
+        if "frame" in summary and summary["frame"]["mean"] > 0:
+            lines.append(f"fps {1000.0 / summary['frame']['mean']:.1f}")
+        surfaces = [font.render(line, True, color) for line in lines]
+        height = font.get_linesize()
+        self.overlay = pygame.Surface((max(s.get_width() for s in surfaces) + 20, height * len(lines) + 20),
+                                      pygame.SRCALPHA)
+        self.overlay.fill((0, 0, 0, 160))
+        for i, surface in enumerate(surfaces):
+            self.overlay.blit(surface, (10, 10 + i * height))
+        return self.overlay, True
+
+    def export(self, directory, prefix="frame_profile"):
+        """Write the ring to <prefix>_<time>.csv and the summary to <prefix>_<time>.json"""
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        csv_path = os.path.join(directory, f"{prefix}_{stamp}.csv")
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([f"{column}_ms" for column in self.columns()])
+            writer.writerows(np.round(self.recent(), 4).tolist())
+        json_path = os.path.join(directory, f"{prefix}_{stamp}.json")
+        with open(json_path, "w") as f:
+            json.dump({"histogram_edges_ms": HISTOGRAM_EDGES_MS.tolist(), "stages": self.summary()}, f, indent=2)
+        return csv_path, json_path
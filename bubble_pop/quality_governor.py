@@ -0,0 +1,160 @@
+import collections
+import time
+
+import numpy as np
+
+# Quality levels from best to cheapest; each one keeps the cuts of the levels before it
+STEPS = [
+    ("full quality", {}),
+    ("light hand model", dict(modelComp=0)),
+    ("480px inference", dict(inferenceWidth=480)),
+    ("slower preview", dict(previewFps=8)),
+    ("320px inference", dict(inferenceWidth=320)),
+    ("fewer circles", dict(maxCircles=25)),
+    ("slower halo and HUD", dict(overlayEvery=3)),
+]
+
+
+class QualityGovernor:
+    """Steps game quality down when frames run over budget and back up when there is room
+
+    Fed the measured frame and inference times every frame. Once the p90 frame time
+    has been over the target_fps budget by down_margin for a settled window, it drops
+    one level; once it has stayed under up_margin of the budget for hold seconds, it
+    climbs one level back. Every change is printed, kept in history and optionally
+    appended to log_path, so operators can see why a station changed quality. Levels
+    that change nothing the controller's detector can apply are stepped over.
+    """
+
+    def __init__(self, target_fps=30, window=60, down_margin=1.1, up_margin=0.7, settle=2.0, hold=5.0,
+                 log_path=None):
+        self.budget_ms = 1000.0 / target_fps
+        self.down_margin = down_margin
+        self.up_margin = up_margin
+        self.settle = settle
+        self.hold = hold
+        self.log_path = log_path
+        self.frame_ms = collections.deque(maxlen=window)
+        self.inference_ms = collections.deque(maxlen=window)
+        self.level = 0
+        self.last_change = None
+        self.headroom_since = None
+        self.base = None
+        self.supported = None   # Settings apply() can push, known once it has seen the controller
+        self.history = []
+
+        self.levels = []
+        settings = {}
+        for name, changes in STEPS:
+            settings = dict(settings, **changes)
+            self.levels.append((name, settings))
+
+    @property
+    def name(self):
+        return self.levels[self.level][0]
+
+    def settings(self, level=None):
+        """The level's settings over the values the game started with; a level never
+        raises quality above what the game was configured for"""
+        level = self.level if level is None else level
+        base = self.base or {}
+        settings = dict(base)
+        for key, value in self.levels[level][1].items():
+            current = base.get(key)
+            if not current:     # None or 0 mean full resolution, every frame or no cap
+                settings[key] = value
+            elif key == "overlayEvery":
+                settings[key] = max(current, value)
+            else:
+                settings[key] = min(current, value)
+        return settings
+
+    def next_level(self, step):
+        """The nearest level in direction step that changes a setting apply() can push, or None"""
+        def effective(level):
+            settings = self.settings(level)
+            return {key: settings.get(key) for key in self.supported or settings}
+
+        current = effective(self.level)
+        level = self.level + step
+        while 0 <= level < len(self.levels):
+            if effective(level) != current:
+                return level
+            level += step
+        return None
+
+    def update(self, frame_ms, inference_ms, now=None):
+        """Record one frame; returns True when the level changed"""
+        now = time.perf_counter() if now is None else now
+        if self.last_change is None:
+            self.last_change = now
+        self.frame_ms.append(frame_ms)
+        self.inference_ms.append(inference_ms)
+        if len(self.frame_ms) < self.frame_ms.maxlen or now - self.last_change < self.settle:
+            return False
+
+        load = float(np.percentile(self.frame_ms, 90))
+        if load > self.budget_ms * self.down_margin:
+            self.headroom_since = None
+            level = self.next_level(1)
+            if level is not None:
+                self.change(level, load, now)
+                return True
+        elif load < self.budget_ms * self.up_margin:
+            if self.headroom_since is None:
+                self.headroom_since = now
+            elif now - self.headroom_since >= self.hold and self.level > 0:
+                # Climbing back may cross levels the detector skipped on the way down
+                self.change(self.next_level(-1) or 0, load, now)
+                return True
+        else:
+            self.headroom_since = None
+        return False
+
+    def change(self, level, load, now):
+        entry = dict(time=time.strftime("%H:%M:%S"), old=self.level, new=level,
+                     frame_p90_ms=load, inference_p90_ms=float(np.percentile(self.inference_ms, 90)),
+                     budget_ms=self.budget_ms)
+        direction = "down" if level > self.level else "up"
+        self.level = level
+        entry["name"] = self.name
+        self.history.append(entry)
+        line = (f"{entry['time']} quality {direction} to level {level} ({self.name}): "
+                f"p90 frame {load:.1f} ms, p90 inference {entry['inference_p90_ms']:.1f} ms, "
+                f"budget {self.budget_ms:.1f} ms")
+        print(line)
+        if self.log_path:
+            try:
+                with open(self.log_path, "a") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                print(f"Could not write quality log: {e}")
+        # New settings need fresh measurements before the next decision
+        self.frame_ms.clear()
+        self.inference_ms.clear()
+        self.last_change = now
+        self.headroom_since = None
+
+    def apply(self, controller):
+        """Push the current level's settings into the controller's detector, preview, model and view"""
+        detector, model = controller.detector, controller.model
+        if self.base is None:
+            self.base = dict(modelComp=getattr(detector, "modelComp", None),
+                             inferenceWidth=getattr(detector, "inferenceWidth", None),
+                             previewFps=controller.preview.fps,
+                             maxCircles=model.max_circles,
+                             overlayEvery=controller.overlay_every)
+            self.supported = {"previewFps", "maxCircles", "overlayEvery"}
+            if hasattr(detector, "set_model_complexity") and self.base["modelComp"] is not None:
+                self.supported.add("modelComp")
+            if hasattr(detector, "set_inference_width"):
+                self.supported.add("inferenceWidth")
+        settings = self.settings()
+        if "modelComp" in self.supported:
+            detector.set_model_complexity(settings["modelComp"])
+        if "inferenceWidth" in self.supported:
+            detector.set_inference_width(settings["inferenceWidth"])
+        controller.preview.fps = settings["previewFps"]
+        model.max_circles = settings["maxCircles"]
+        model.min_circles = min(model.min_circles, model.max_circles)
+        controller.overlay_every = settings["overlayEvery"]
@@ -1,25 +1,80 @@
+import random
+import time
+
 import pygame
 
+from gestures import GestureEngine, GESTURE_EVENT
+
+CHUNK_HEIGHT = 200  # World pixels per level chunk, one floor each
+WORLD_WIDTH = 600
+CHUNKS_AHEAD = 2    # Chunks generated above the viewport before they scroll into view
+CHUNKS_BEHIND = 1   # Chunks kept below the viewport before they are evicted
+USE_CAMERA = False  # Climb by raising an open palm in front of the camera
+
+
+class Chunk:
+    """One fixed-height slice of the level, in world coordinates
+
+    Generated from its index and the level seed alone, so an evicted chunk comes back
+    identical when the player slides back down to it.
+    """
+
+    def __init__(self, index, seed):
+        rng = random.Random(seed * 1000003 + index)
+        top = index * CHUNK_HEIGHT
+        self.index = index
+        self.floors = [pygame.Rect(0, top + 100, WORLD_WIDTH, 20)]
+        self.ladders = [pygame.Rect(rng.randrange(0, WORLD_WIDTH - 50, 50), top, 50, 100)
+                        for _ in range(rng.randint(1, 2))]
+        # Snakes hang from this chunk down into the one below
+        self.snakes = []
+        if rng.random() < 0.5:
+            self.snakes.append(pygame.Rect(rng.randrange(0, WORLD_WIDTH - 50, 50), top + 150, 50, 150))
+
+
 # Model class
 class GameModel:
-    def __init__(self):
-        self.ladders = [pygame.Rect(100, 400, 50, 100), pygame.Rect(200, 200, 50, 100)]
-        self.floors = [pygame.Rect(0, 500, 600, 20), pygame.Rect(0, 300, 600, 20), pygame.Rect(0, 100, 600, 20)]
-        self.snakes = [pygame.Rect(300, 350, 50, 150)]
-        self.man = pygame.Rect(250, 450, 30, 30)
-
-    def move_ladders_snakes_floors(self, dy):
-        """Move ladders, snakes, and floors by dy"""
-        for ladder in self.ladders:
-            ladder.y += dy
-        for floor in self.floors:
-            floor.y += dy
-        for snake in self.snakes:
-            snake.y += dy
-
-    def reset_snake(self):
-        """Reset snake's position to its original place"""
-        self.snakes[0].y = 350
+    """Endless tower in world coordinates, seen through a camera at world y camera_y
+
+    Scrolling only moves the camera; chunks are built as they come within CHUNKS_AHEAD
+    of the viewport and dropped once they fall CHUNKS_BEHIND below it, so the level
+    costs the same however tall it grows.
+    """
+
+    def __init__(self, view_height=600, seed=0):
+        self.view_height = view_height
+        self.seed = seed
+        self.camera_y = 0   # World y at the top of the screen
+        self.chunks = {}    # Chunk index -> Chunk, only those near the viewport
+        self.man = pygame.Rect(250, 450, 30, 30)  # World coordinates, moves with the camera
+        self.update_chunks()
+
+    def chunk_range(self):
+        """Indices of the first and last chunk overlapping the viewport"""
+        return self.camera_y // CHUNK_HEIGHT, (self.camera_y + self.view_height - 1) // CHUNK_HEIGHT
+
+    def update_chunks(self):
+        first, last = self.chunk_range()
+        keep = range(first - CHUNKS_AHEAD, last + CHUNKS_BEHIND + 1)
+        for index in [index for index in self.chunks if index not in keep]:
+            del self.chunks[index]
+        for index in keep:
+            if index not in self.chunks:
+                self.chunks[index] = Chunk(index, self.seed)
+
+    def visible_chunks(self):
+        """Chunks on screen, plus the one above whose snakes may hang into view"""
+        first, last = self.chunk_range()
+        return [self.chunks[index] for index in range(first - 1, last + 1)]
+
+    def scroll(self, dy):
+        """Climb by dy world pixels (negative to slide down); the world appears to move down by dy"""
+        self.camera_y -= dy
+        self.man.y -= dy
+        self.update_chunks()
+
+    def to_screen(self, rect):
+        return rect.move(0, -self.camera_y)
 
 
 # View class
@@ -29,13 +84,17 @@ class GameView:
 
     def draw(self, model):
         self.screen.fill((255, 255, 255))  # Clear screen with white
-        pygame.draw.rect(self.screen, (0, 255, 0), model.man)       # Man - green
-        for ladder in model.ladders:
-            pygame.draw.rect(self.screen, (0, 0, 255), ladder)      # Ladders - blue
-        for floor in model.floors:
-            pygame.draw.rect(self.screen, (139, 69, 19), floor)     # Floors - brown
-        for snake in model.snakes:
-            pygame.draw.rect(self.screen, (255, 0, 0), snake)       # Snakes - red
+        pygame.draw.rect(self.screen, (0, 255, 0), model.to_screen(model.man))       # Man - green
+        chunks = model.visible_chunks()
+        for chunk in chunks:
+            for ladder in chunk.ladders:
+                pygame.draw.rect(self.screen, (0, 0, 255), model.to_screen(ladder))      # Ladders - blue
+        for chunk in chunks:
+            for floor in chunk.floors:
+                pygame.draw.rect(self.screen, (139, 69, 19), model.to_screen(floor))     # Floors - brown
+        for chunk in chunks:
+            for snake in chunk.snakes:
+                pygame.draw.rect(self.screen, (255, 0, 0), model.to_screen(snake))       # Snakes - red
         pygame.display.flip()  # Update display
 
 
@@ -47,10 +106,13 @@ class GameController:
     def handle_input(self):
         keys = pygame.key.get_pressed()
         if keys[pygame.K_l]:
-            self.model.move_ladders_snakes_floors(50)  # Move ladders and floors down
+            self.model.scroll(50)  # Climb: ladders and floors move down
         elif keys[pygame.K_s]:
-            self.model.move_ladders_snakes_floors(-50)  # Move ladders and floors up
-            self.model.reset_snake()  # Reset snake position
+            self.model.scroll(-50)  # Slide: ladders and floors move up
+
+    def handle_event(self, event):
+        if event.type == GESTURE_EVENT and event.gesture == "climb" and event.started:
+            self.model.scroll(50)
 
 
 # Main Game Loop
@@ -62,15 +124,30 @@ def main():
     clock = pygame.time.Clock()
 
     # Initialize Model, View, Controller
-    model = GameModel()
+    model = GameModel(screen.get_height())
     view = GameView(screen)
     controller = GameController(model)
 
+    if USE_CAMERA:
+        import cv2
+        from Hand import HandDetector
+        from camera_discovery import get_camera_index
+        cap = cv2.VideoCapture(get_camera_index())
+        detector = HandDetector(maxHands=1)
+        gestures = GestureEngine(max_hands=1)
+
     running = True
     while running:
+        if USE_CAMERA:
+            success, img = cap.read()
+            if success:
+                detector.findHands(img, draw=False)
+                gestures.process(detector.findAllPositions(img)[0], time.perf_counter())
+
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            controller.handle_event(event)
 
         # Controller: Handle input
         controller.handle_input()
@@ -80,6 +157,8 @@ def main():
 
         clock.tick(30)  # 30 frames per second
 
+    if USE_CAMERA:
+        cap.release()
     pygame.quit()
 
 
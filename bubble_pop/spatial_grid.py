@@ -0,0 +1,79 @@
+import numpy as np
+
+
+def _offsets(reach):
+    """Cell offsets of the (2*reach+1)^2 block around a cell"""
+    span = np.arange(-reach, reach + 1)
+    dy, dx = np.meshgrid(span, span, indexing='ij')
+    return dx.ravel(), dy.ravel()
+
+
+class UniformGrid:
+    """Uniform grid over the play field, rebuilt every tick from the circle positions
+
+    With cell_size >= the query radius every hit lies in the 3x3 block of cells around
+    a pointer, so each pointer only looks at the circles in those cells. Larger radii
+    widen the block accordingly.
+    """
+
+    def __init__(self, width, height, cell_size):
+        self.cell_size = float(cell_size)
+        self.cols = int(np.ceil(width / cell_size)) + 1
+        self.rows = int(np.ceil(height / cell_size)) + 1
+        self.sorted_cells = np.zeros(0, dtype=np.int64)
+        self.sorted_ids = np.zeros(0, dtype=np.int64)
+        self.positions = np.zeros((0, 2))
+        self.offsets = {}
+
+    def cell_coords(self, points):
+        cx = np.clip((points[:, 0] // self.cell_size).astype(np.int64), 0, self.cols - 1)
+        cy = np.clip((points[:, 1] // self.cell_size).astype(np.int64), 0, self.rows - 1)
+        return cx, cy
+
+    def build(self, positions, ids):
+        """Bucket the given ids by the cell their position falls in"""
+        self.positions = positions
+        cx, cy = self.cell_coords(positions[ids])
+        cells = cy * self.cols + cx
+        order = np.argsort(cells, kind='stable')
+        self.sorted_cells = cells[order]
+        self.sorted_ids = np.asarray(ids)[order]
+
+    def candidates(self, points, radius):
+        """(point_index, id) pairs for every id in the cells within radius of a point"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        empty = np.zeros(0, dtype=np.int64)
+        if len(points) == 0 or len(self.sorted_ids) == 0:
+            return points, empty, empty
+        reach = max(1, int(np.ceil(radius / self.cell_size)))
+        if reach not in self.offsets:
+            self.offsets[reach] = _offsets(reach)
+        offsets_x, offsets_y = self.offsets[reach]
+        block = len(offsets_x)
+
+        cx, cy = self.cell_coords(points)
+        nx = cx[:, None] + offsets_x
+        ny = cy[:, None] + offsets_y
+        valid = (nx >= 0) & (nx < self.cols) & (ny >= 0) & (ny < self.rows)
+        cells = (ny * self.cols + nx).ravel()
+        start = np.searchsorted(self.sorted_cells, cells, side='left')
+        end = np.searchsorted(self.sorted_cells, cells, side='right')
+        counts = np.where(valid.ravel(), end - start, 0)
+        total = int(counts.sum())
+        if total == 0:
+            return points, empty, empty
+
+        # Expand every (point, cell) range into one entry per candidate
+        point_of = np.repeat(np.repeat(np.arange(len(points)), block), counts)
+        first = np.repeat(start, counts)
+        offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        return points, point_of, self.sorted_ids[first + offset]
+
+    def query(self, points, radius):
+        """Return (point_index, id) pairs for every id within radius of a point"""
+        points, point_of, ids = self.candidates(points, radius)
+        if len(ids) == 0:
+            return point_of, ids
+        d = self.positions[ids] - points[point_of]
+        inside = (d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]) < radius * radius
+        return point_of[inside], ids[inside]
@@ -0,0 +1,125 @@
+"""Run several Pranic Poppers stations from one process
+
+Every station has its own camera, Model and viewport of one shared window, and all
+of them share a small InferencePool of MediaPipe workers, so adding a station adds a
+capture thread and some drawing rather than another MediaPipe graph fighting for cores.
+Keys go to the focused station: press 1-9 or click a viewport to focus it.
+
+    python bubble_pop/station_host.py --cameras 0 2 4 --workers 2
+"""
+import argparse
+import math
+
+import pygame
+
+import pranic_poppers as pp
+from camera_discovery import list_devices, probe_all
+from gestures import GESTURE_EVENT
+from inference_pool import InferencePool
+
+
+class StationView(pp.View):
+    """View drawing into one viewport of the host window; the host presents all of them at once"""
+
+    def present(self):
+        pass
+
+
+def viewports(size, count):
+    """Split a window of the given size into a near-square grid of count rects"""
+    cols = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / cols)
+    width, height = size[0] // cols, size[1] // rows
+    return [pygame.Rect((i % cols) * width, (i // cols) * height, width, height) for i in range(count)]
+
+
+class StationHost:
+    def __init__(self, screen, cameras, workers=2, max_age=0.1):
+        """cameras is a list of camera indices or capture objects, one per station"""
+        self.screen = screen
+        max_hands = pp.MAX_HANDS if pp.MULTI_HAND else 2
+        self.pool = InferencePool(workers, maxHands=max_hands, detectionCon=0.7, max_age=max_age)
+        self.rects = viewports(screen.get_size(), len(cameras))
+        self.stations = []
+        for i, (camera, rect) in enumerate(zip(cameras, self.rects)):
+            surface = screen.subsurface(rect)
+            cap = pp.Controller.open_camera(camera) if isinstance(camera, int) else camera
+            model = pp.Model()
+            station = pp.Controller(surface, cap=cap, detector=self.pool.detector(), model=model,
+                                    view=StationView(surface, model), name=f"station{i}")
+            self.stations.append(station)
+        self.focus = 0
+        self.clock = pygame.time.Clock()
+        self.running = True
+
+    def process_events(self):
+        """Quit on ESC, move focus on 1-9 or a click, send gestures to the station that saw
+        them and hand the rest to the focused station"""
+        events = []
+        gestures = {i: [] for i in range(len(self.stations))}
+        for event in pygame.event.get():
+            if event.type == GESTURE_EVENT:
+                for i, station in enumerate(self.stations):
+                    if event.engine is station.gestures:
+                        gestures[i].append(event)
+            elif event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                self.running = False
+            elif event.type == pygame.KEYDOWN and pygame.K_1 <= event.key <= pygame.K_9:
+                self.focus = min(event.key - pygame.K_1, len(self.stations) - 1)
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                for i, rect in enumerate(self.rects):
+                    if rect.collidepoint(event.pos):
+                        self.focus = i
+            else:
+                events.append(event)
+        for i, station in enumerate(self.stations):
+            station_events = gestures[i] + events if i == self.focus else gestures[i]
+            if station_events:
+                station.process_events(station_events)
+
+    def run(self):
+        while self.running:
+            frame_dt = self.clock.tick(pp.RENDER_FPS) / 1000.0
+            self.process_events()
+            for station in self.stations:
+                if station.running:
+                    station.update(frame_dt)
+            # Dispatch once every station has submitted its frame, so they all compete fairly
+            self.pool.pump()
+            pygame.display.flip()
+
+        for i, stats in enumerate(self.pool.stats()):
+            print(f"Station {i}: {stats['served']} frames run, {stats['dropped']} dropped")
+        for station in self.stations:
+            station.stream.stop()
+            if station.trace_writer is not None:
+                station.trace_writer.close()
+            station.cap.release()
+        self.pool.close()
+        pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cameras", type=int, nargs="+",
+                        help="Camera indices, one per station (default: every working camera)")
+    parser.add_argument("--workers", type=int, default=2, help="MediaPipe worker processes")
+    parser.add_argument("--max-age", type=float, default=0.1, help="Drop frames waiting longer than this (s)")
+    parser.add_argument("--windowed", action="store_true")
+    args = parser.parse_args()
+
+    cameras = args.cameras
+    if not cameras:
+        cameras = [camera["index"] for camera in probe_all(list_devices())]
+    if not cameras:
+        parser.error("no working camera found")
+
+    pp.init_pygame()
+    flags = 0 if args.windowed else pygame.FULLSCREEN
+    screen = pygame.display.set_mode((1280, 720) if args.windowed else (0, 0), flags)
+    pygame.display.set_caption("Hand Tracking Game")
+    StationHost(screen, cameras, args.workers, args.max_age).run()
+
+
+if __name__ == "__main__":
+    main()
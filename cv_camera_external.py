@@ -1,7 +1,10 @@
 import cv2
 
 import os
-from subprocess import PIPE, run
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "bubble_pop"))
+from camera_discovery import get_camera_index
 
 def find_external_camera(max_index=5):
     external_camera_index = None
@@ -32,25 +35,6 @@ def find_external_camera(max_index=5):
 # Find the external camera
 # external_camera_index = find_external_camera(max_index=10)
 
-def get_camera_index():
-    usb_needle = "USB Camera"
-    buildin_needle = "FaceTime HD Camera (Built-in)"
-    command = ['ffmpeg','-f', 'avfoundation','-list_devices','true','-i','""']
-    result = run(command, stdout=PIPE, stderr=PIPE, universal_newlines=True)
-    usb_id = None
-    builtin_id = None
-    for item in result.stderr.splitlines():
-        # print(item)
-        if usb_needle in item:
-            usb_id = int(item.split("[")[2].split(']')[0])
-        if buildin_needle in item:
-            builtin_id = int(item.split("[")[2].split(']')[0])
-
-    if usb_id is not None:
-        return usb_id
-    return builtin_id
-
-
 external_camera_index = get_camera_index()
 
 if external_camera_index is not None: